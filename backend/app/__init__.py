@@ -1,13 +1,15 @@
 import os
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
+from sqlalchemy.orm.exc import StaleDataError
 from .config import Config
+from .replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
 migrate = Migrate()
@@ -24,7 +26,29 @@ def create_app(config_class=Config):
     bcrypt.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
-    CORS(app)
+    CORS(app, expose_headers=['ETag', 'Retry-After', 'Idempotent-Replayed', 'X-Cache'])
+    
+    from . import replica
+    replica.init_app(app)
+    
+    # Scope queries to the caller's depot; importing registers the session event hooks
+    from . import depots  # noqa: F401
+    
+    from .audit import audit_log
+    audit_log.init_app(app)
+    
+    from . import revocation
+    revocation.init_app(app)
+    
+    from . import ratelimit
+    ratelimit.init_app(app)
+    
+    from . import response_cache
+    response_cache.init_app(app)
+    
+    # CLI commands (flask fleet ...)
+    from .cli import fleet_cli
+    app.cli.add_command(fleet_cli)
     
     # Register blueprints
     from .routes.auth import auth_bp
@@ -33,6 +57,12 @@ def create_app(config_class=Config):
     from .routes.users import users_bp
     from .routes.trips import trips_bp
     from .routes.maintenance import maintenance_bp
+    from .routes.search import search_bp
+    from .routes.reports import reports_bp
+    from .routes.audit import audit_bp
+    from .routes.telemetry import telemetry_bp
+    from .routes.jobs import jobs_bp
+    from .routes.depots import depots_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(vehicles_bp, url_prefix='/api/vehicles')
@@ -40,6 +70,27 @@ def create_app(config_class=Config):
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(trips_bp, url_prefix='/api/trips')
     app.register_blueprint(maintenance_bp, url_prefix='/api/maintenance')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(audit_bp, url_prefix='/api/audit')
+    app.register_blueprint(telemetry_bp, url_prefix='/api/telemetry')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(depots_bp, url_prefix='/api/depots')
+    
+    # A versioned row changed underneath an ORM update (optimistic lock lost)
+    @app.errorhandler(StaleDataError)
+    def handle_stale_data(error):
+        db.session.rollback()
+        return jsonify({'message': 'Record was modified by another request, please retry'}), 409
+    
+    # Tag API reads so clients can revalidate cached collections with If-None-Match
+    @app.after_request
+    def add_etag(response):
+        if (request.method == 'GET' and request.path.startswith('/api/')
+                and response.status_code == 200 and not response.direct_passthrough):
+            response.add_etag()
+            response.make_conditional(request)
+        return response
     
     # Serve frontend static files
     @app.route('/')
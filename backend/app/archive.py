@@ -0,0 +1,61 @@
+"""Cold storage for completed trips.
+
+Completed trips older than TRIP_ARCHIVE_DAYS are moved from ``trips`` to
+``trips_archive`` in batches. Each batch copies and deletes the same ids in
+one transaction, so the mover can be stopped at any point and rerun; it
+simply continues with whatever is still in the hot table. Archived trips
+keep counting towards mileage and lane totals but leave the search index.
+
+Trip ids are never reused (``sqlite_autoincrement`` on SQLite), so an id
+names the same trip in either table. A database that reused ids before
+that was in place can hold a live trip whose id is already archived; the
+mover stops with ArchiveConflict rather than overwrite or duplicate it.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, literal, select
+from app import db
+from app.models import Trip, TripArchive
+
+
+class ArchiveConflict(Exception):
+    """Trips due for archiving share ids with trips already in the archive."""
+
+
+def archive_trips(older_than_days, batch_size=1000, max_batches=None):
+    """Move completed trips older than ``older_than_days``; returns the number moved."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    trips = Trip.__table__
+    columns = [c.name for c in trips.columns]
+    moved = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(Trip.id)
+            .where(Trip.status == 'completed', Trip.completed_at < cutoff)
+            .order_by(Trip.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        clashes = db.session.execute(
+            select(TripArchive.__table__.c.id).where(TripArchive.__table__.c.id.in_(ids))
+        ).scalars().all()
+        if clashes:
+            db.session.rollback()
+            raise ArchiveConflict(
+                f'trip ids already archived: {", ".join(map(str, sorted(clashes)))}; '
+                'renumber these trips before archiving them'
+            )
+
+        db.session.execute(insert(TripArchive.__table__).from_select(
+            columns + ['archived_at'],
+            select(*[trips.c[name] for name in columns], literal(datetime.utcnow()))
+            .where(trips.c.id.in_(ids)),
+        ))
+        db.session.execute(delete(trips).where(trips.c.id.in_(ids)))
+        db.session.commit()
+
+        moved += len(ids)
+        batches += 1
+
+    return moved
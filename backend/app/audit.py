@@ -0,0 +1,209 @@
+"""Append-only audit log of changes to fleet records.
+
+Changes are captured from the session as they flush (ORM writes) or from
+``transitions.transition`` (conditional UPDATEs), attributed to the JWT
+identity of the request, and handed to an in-process buffer only once the
+transaction commits. A background thread writes the buffer to
+``audit_events`` in batches every AUDIT_FLUSH_INTERVAL seconds (or sooner
+once AUDIT_BATCH_SIZE events are waiting), so requests never wait on the
+audit insert. Each event records the depot of the changed record, so
+depot-scoped callers only read their own depot's history (app/depots.py).
+Events still buffered when a worker is killed are lost;
+a clean shutdown flushes them. While the database is unreachable the
+buffer holds at most AUDIT_BUFFER_MAX events, dropping (and logging) the
+oldest beyond that.
+"""
+import atexit
+import os
+import threading
+from datetime import date, datetime
+from flask import current_app, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.depots import current_depot
+from app.models import AuditEvent, Driver, Maintenance, Trip, User, Vehicle
+
+AUDITED_MODELS = (User, Vehicle, Driver, Trip, Maintenance)
+
+# Never written to the log
+REDACTED_FIELDS = {'password_hash'}
+
+
+def jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def current_actor():
+    if not has_request_context():
+        return None
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no JWT verified for this request
+        return None
+
+
+def _caller_depot():
+    return current_depot() if has_request_context() else None
+
+
+def _make_event(action, entity, entity_id, changes, depot_id=None):
+    return {
+        'depot_id': _caller_depot() if depot_id is None else depot_id,
+        'actor': current_actor(),
+        'action': action,
+        'entity': entity,
+        'entity_id': None if entity_id is None else str(entity_id),
+        'changes': changes,
+        'created_at': datetime.utcnow(),
+    }
+
+
+def stage(session, action, entity, entity_id, changes, depot_id=None):
+    """Queue an event on the session; it is logged only if the session commits.
+
+    ``depot_id`` is the changed record's depot; it defaults to the caller's.
+    """
+    session.info.setdefault('audit_events', []).append(
+        _make_event(action, entity, entity_id, changes, depot_id))
+
+
+def snapshot(obj, keys=None):
+    """Loaded column values of ``obj`` (optionally only ``keys``), JSON-ready.
+
+    Reads the instance dict only, so expired attributes never trigger a query.
+    """
+    loaded = inspect(obj).dict
+    return {column.key: jsonable(loaded.get(column.key))
+            for column in inspect(type(obj)).column_attrs
+            if column.key not in REDACTED_FIELDS and (keys is None or column.key in keys)}
+
+
+def _identity(obj):
+    key = inspect(type(obj)).primary_key_from_instance(obj)
+    return key[0] if len(key) == 1 else '/'.join(str(k) for k in key)
+
+
+def _depot(obj):
+    return inspect(obj).dict.get('depot_id')
+
+
+@event.listens_for(Session, 'after_flush')
+def _capture_flush(session, flush_context):
+    if not has_app_context() or 'audit' not in current_app.extensions:
+        return
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            after = snapshot(obj)
+            stage(session, 'create', obj.__tablename__, _identity(obj),
+                  {k: [None, v] for k, v in after.items() if v is not None}, _depot(obj))
+    for obj in session.dirty:
+        if not isinstance(obj, AUDITED_MODELS):
+            continue
+        state, changes = inspect(obj), {}
+        for column in inspect(type(obj)).column_attrs:
+            if column.key in REDACTED_FIELDS or column.key == 'version':
+                continue
+            history = state.attrs[column.key].history
+            if history.has_changes():
+                before = history.deleted[0] if history.deleted else None
+                after = history.added[0] if history.added else None
+                changes[column.key] = [jsonable(before), jsonable(after)]
+        if changes:
+            stage(session, 'update', obj.__tablename__, _identity(obj), changes, _depot(obj))
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            before = snapshot(obj)
+            stage(session, 'delete', obj.__tablename__, _identity(obj),
+                  {k: [v, None] for k, v in before.items() if v is not None}, _depot(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish(session):
+    events = session.info.pop('audit_events', None)
+    if events and has_app_context() and 'audit' in current_app.extensions:
+        current_app.extensions['audit'].enqueue(events)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard(session, previous_transaction):
+    session.info.pop('audit_events', None)
+
+
+class AuditLog:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config['AUDIT_FLUSH_INTERVAL']
+        self.batch_size = app.config['AUDIT_BATCH_SIZE']
+        self.max_buffered = app.config['AUDIT_BUFFER_MAX']
+        app.extensions['audit'] = self
+        atexit.register(self.flush)
+
+    def enqueue(self, events):
+        if self._pid != os.getpid():  # forked worker: start with a clean buffer/thread
+            self._reset()
+        with self._lock:
+            self._buffer.extend(events)
+            self._trim()
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _trim(self):
+        """Drop the oldest events beyond AUDIT_BUFFER_MAX (call with the lock held)."""
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self.app.logger.error('Audit buffer full; dropped the %d oldest events', excess)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all buffered events in one multi-row INSERT; returns the number written.
+
+        Never raises: on failure the events are logged and kept for the next attempt.
+        """
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(insert(AuditEvent.__table__), events)
+        except Exception:
+            self.app.logger.exception('Failed to write %d audit events', len(events))
+            with self._lock:  # keep them for the next attempt
+                self._buffer[:0] = events
+                self._trim()
+            return 0
+        return len(events)
+
+
+audit_log = AuditLog()
+
+
+@event.listens_for(AuditEvent, 'before_update')
+@event.listens_for(AuditEvent, 'before_delete')
+def _append_only(mapper, connection, target):
+    raise ValueError('Audit events are append-only')
@@ -0,0 +1,105 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+fleet_cli = AppGroup('fleet', help='Fleet maintenance commands.')
+
+
+@fleet_cli.command('recompute-mileage')
+def recompute_mileage_command():
+    """Rebuild vehicle mileage and driver odometers from completed trips."""
+    from app.mileage import recompute_mileage
+    vehicles, drivers = recompute_mileage()
+    click.echo(f'Recomputed mileage for {vehicles} vehicles and {drivers} drivers')
+
+
+@fleet_cli.command('enqueue-service')
+def enqueue_service_command():
+    """Create pending maintenance for vehicles past their service mileage."""
+    from app.mileage import enqueue_mileage_service
+    created = enqueue_mileage_service(current_app.config['SERVICE_INTERVALS_KM'])
+    click.echo(f'{created} maintenance records scheduled')
+
+
+@fleet_cli.command('rebuild-search')
+def rebuild_search_command():
+    """Create or rebuild the search index."""
+    from app.search import get_search_backend
+    backend = get_search_backend()
+    backend.init(rebuild=True)
+    click.echo(f'Search index rebuilt ({backend.name})')
+
+
+@fleet_cli.command('backfill-lanes')
+@click.option('--batch-size', default=1000, show_default=True, help='Distinct place names per batch.')
+def backfill_lanes_command(batch_size):
+    """Intern trip locations and rebuild the lane rollup."""
+    from app.lanes import backfill_lanes
+    locations, lanes = backfill_lanes(batch_size)
+    click.echo(f'{locations} locations, {lanes} lane/period rows')
+
+
+@fleet_cli.command('archive-trips')
+@click.option('--days', type=int, default=None, help='Archive trips completed more than this many days ago (default TRIP_ARCHIVE_DAYS).')
+@click.option('--batch-size', default=1000, show_default=True, help='Trips moved per transaction.')
+def archive_trips_command(days, batch_size):
+    """Move old completed trips into trips_archive."""
+    from app.archive import ArchiveConflict, archive_trips
+    if days is None:
+        days = current_app.config['TRIP_ARCHIVE_DAYS']
+    try:
+        moved = archive_trips(days, batch_size)
+    except ArchiveConflict as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{moved} trips archived')
+
+
+@fleet_cli.command('sweep-licenses')
+def sweep_licenses_command():
+    """Suspend drivers whose license has lapsed and reinstate renewed ones."""
+    from app import db
+    from app.compliance import sweep_licenses
+    suspended, reinstated = sweep_licenses()
+    db.session.commit()
+    click.echo(f'{len(suspended)} drivers suspended, {len(reinstated)} reinstated')
+
+
+@fleet_cli.command('prune-revoked-tokens')
+def prune_revoked_tokens_command():
+    """Delete revocation entries whose tokens have all expired."""
+    from app.revocation import prune_revoked_tokens
+    removed = prune_revoked_tokens()
+    click.echo(f'{removed} expired revocations removed')
+
+
+@fleet_cli.command('worker')
+@click.option('--poll', default=1.0, show_default=True, help='Seconds between polls of an empty queue.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def worker_command(poll, burst):
+    """Run queued background jobs."""
+    from app.jobs import run_worker
+    ran = run_worker(poll_interval=poll, burst=burst)
+    click.echo(f'Worker stopped after {ran} jobs')
+
+
+@fleet_cli.command('enqueue')
+@click.argument('name')
+@click.option('--arg', 'args', multiple=True, help='Job argument as key=value (value parsed as JSON when possible).')
+def enqueue_command(name, args):
+    """Queue a background job, e.g. flask fleet enqueue archive-trips --arg days=30."""
+    import json
+    from app.jobs import TASKS, enqueue
+    if name not in TASKS:
+        raise click.BadParameter(f"unknown job; choose from {', '.join(sorted(TASKS))}", param_hint='NAME')
+    values = {}
+    for item in args:
+        key, _, raw = item.partition('=')
+        try:
+            values[key] = json.loads(raw)
+        except ValueError:
+            values[key] = raw
+    try:
+        job = enqueue(name, values)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--arg')
+    click.echo(f'Queued job {job.id} ({name})')
@@ -0,0 +1,178 @@
+"""Driver license compliance.
+
+A driver may take trips while their status is available or assigned and
+their license is valid until at least today + LICENSE_EXPIRY_LEAD_DAYS (a
+driver with no expiry on file is not blocked).
+
+- sweep: ``sweep_licenses`` suspends every driver whose license has lapsed
+  and reinstates suspended drivers whose license was renewed, with one
+  conditional UPDATE each over the ``license_expiry`` index
+- eligibility: each worker keeps the eligible-status drivers and their
+  expiry dates in a dict, built with one query and kept current from the
+  driver changes this worker commits, so ``create_trip`` checks a driver in
+  O(1). The dict spans every depot and records each driver's depot, so a
+  trip only takes a driver from its vehicle's depot. Expiry is compared on every check, so a license lapsing overnight
+  takes effect without a sweep. Status changes made by other workers are
+  picked up when the dict is rebuilt after DRIVER_ELIGIBILITY_TTL seconds;
+  a driver missing from it is looked up once before being refused, so
+  drivers added or reinstated elsewhere are never wrongly turned away.
+"""
+import threading
+import time
+from datetime import date, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Driver
+from app.depots import unscoped
+from app.transitions import transition_ids
+
+ELIGIBLE_STATUSES = ('available', 'assigned')
+SUSPENDED = 'suspended'
+
+
+def license_cutoff(today=None):
+    """Licenses expiring before this date bar a driver from trips."""
+    return (today or date.today()) + timedelta(days=current_app.config['LICENSE_EXPIRY_LEAD_DAYS'])
+
+
+def license_valid(expiry, today=None):
+    return expiry is None or expiry >= license_cutoff(today)
+
+
+class EligibleDrivers:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._drivers = {}  # phone -> (license_expiry, depot_id) of drivers in an eligible status
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            with unscoped():
+                rows = db.session.execute(
+                    select(Driver.phone, Driver.license_expiry, Driver.depot_id)
+                    .where(Driver.status.in_(ELIGIBLE_STATUSES))
+                ).all()
+            self._drivers = {phone: (expiry, depot_id) for phone, expiry, depot_id in rows}
+            self._built_at = time.monotonic()
+
+    def _apply(self, changes):
+        for phone, status, expiry, depot_id in changes:
+            if status in ELIGIBLE_STATUSES:
+                self._drivers[phone] = (expiry, depot_id)
+            else:
+                self._drivers.pop(phone, None)
+
+    def apply(self, changes):
+        """Apply committed (phone, status, license_expiry, depot_id) changes; status None when deleted."""
+        with self._lock:
+            if self._built_at is not None:
+                self._apply(changes)
+
+    def invalidate(self):
+        """Drop the set; it is rebuilt on next use."""
+        with self._lock:
+            self._built_at = None
+
+    def is_eligible(self, phone, depot_id=None, today=None):
+        """Whether the driver may take a trip (from ``depot_id``, when given)."""
+        with self._lock:
+            self._ensure_built()
+            entry = self._drivers.get(phone)
+        if entry is None:
+            # Possibly created or reinstated by another worker since the last build
+            with unscoped():
+                row = db.session.execute(
+                    select(Driver.status, Driver.license_expiry, Driver.depot_id).where(Driver.phone == phone)
+                ).first()
+            if row is None or row.status not in ELIGIBLE_STATUSES:
+                return False
+            entry = (row.license_expiry, row.depot_id)
+            self.apply([(phone, row.status, *entry)])
+        expiry, driver_depot = entry
+        if depot_id is not None and driver_depot != depot_id:
+            return False
+        return license_valid(expiry, today)
+
+
+def get_eligible_drivers():
+    """The current app's EligibleDrivers (one per worker process)."""
+    drivers = current_app.extensions.get('eligible_drivers')
+    if drivers is None:
+        drivers = EligibleDrivers(current_app.config['DRIVER_ELIGIBILITY_TTL'])
+        current_app.extensions['eligible_drivers'] = drivers
+    return drivers
+
+
+def compliance_report(window, today=None):
+    """(expired, expiring) drivers whose license lapses before today + window, soonest first."""
+    today = today or date.today()
+    drivers = (
+        Driver.query
+        .filter(Driver.license_expiry < today + window)
+        .order_by(Driver.license_expiry, Driver.phone)
+        .all()
+    )
+    expired = [d for d in drivers if d.license_expiry < today]
+    expiring = [d for d in drivers if d.license_expiry >= today]
+    return expired, expiring
+
+
+def sweep_licenses(today=None):
+    """Suspend drivers with lapsed licenses and reinstate renewed ones (caller commits).
+
+    Returns (suspended phones, reinstated phones).
+    """
+    cutoff = license_cutoff(today)
+    suspended = transition_ids(Driver,
+                               Driver.license_expiry < cutoff,
+                               Driver.status.in_(ELIGIBLE_STATUSES),
+                               status=SUSPENDED)
+    reinstated = transition_ids(Driver,
+                                Driver.status == SUSPENDED,
+                                or_(Driver.license_expiry.is_(None), Driver.license_expiry >= cutoff),
+                                status='available')
+    return suspended, reinstated
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_driver_changes(session, flush_context):
+    """Queue eligibility updates for flushed drivers; applied only once committed."""
+    if not has_app_context() or 'eligible_drivers' not in current_app.extensions:
+        return
+    changes = [(d.phone, d.status, d.license_expiry, d.depot_id)
+               for d in list(session.new) + list(session.dirty) if isinstance(d, Driver)]
+    changes += [(d.phone, None, None, None) for d in session.deleted if isinstance(d, Driver)]
+    if changes:
+        session.info.setdefault('driver_changes', []).extend(changes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_driver_statements(orm_execute_state):
+    # Bulk UPDATE/DELETE (e.g. the sweep) can touch any number of drivers
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if getattr(orm_execute_state.statement.table, 'name', None) == Driver.__tablename__:
+            orm_execute_state.session.info['drivers_bulk_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_driver_changes(session):
+    changes = session.info.pop('driver_changes', None)
+    bulk = session.info.pop('drivers_bulk_changed', False)
+    if not has_app_context():
+        return
+    drivers = current_app.extensions.get('eligible_drivers')
+    if drivers is None:
+        return
+    if bulk:
+        drivers.invalidate()
+    elif changes:
+        drivers.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_driver_changes(session, previous_transaction):
+    session.info.pop('driver_changes', None)
+    session.info.pop('drivers_bulk_changed', None)
@@ -0,0 +1,21 @@
+"""Helpers for running under cooperative (gevent) gunicorn workers."""
+
+
+def _gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def run_blocking(func, *args):
+    """Run a CPU-heavy call that releases the GIL (e.g. bcrypt).
+
+    Under gevent the call is handed to the hub's native thread pool so other
+    greenlets keep serving requests; otherwise it simply runs inline.
+    """
+    if _gevent_active():
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
@@ -17,9 +17,124 @@ class Config:
     SQLALCHEMY_DATABASE_URI = db_url or 'sqlite:///fleet_management.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Optional read replica for GET endpoints (see app/replica.py)
+    replica_url = os.environ.get('REPLICA_DATABASE_URL')
+    if replica_url and replica_url.startswith("postgres://"):
+        replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_BINDS = {'replica': replica_url} if replica_url else {}
+    
+    # Seconds a caller keeps reading from the primary after a write
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
+    # Connection pool; raise DB_POOL_SIZE when running gevent workers, where
+    # one process serves many concurrent requests
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True}
+    if os.environ.get('DB_POOL_SIZE'):
+        SQLALCHEMY_ENGINE_OPTIONS['pool_size'] = int(os.environ['DB_POOL_SIZE'])
+        SQLALCHEMY_ENGINE_OPTIONS['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    
+    # Mileage-based service: maintenance type -> distance between services
+    SERVICE_INTERVALS_KM = {
+        'oil change': 5000,
+        'service': 10000,
+    }
+    
+    # Time-based service: maintenance type -> days between services
+    SERVICE_INTERVALS_DAYS = {
+        'oil change': 90,
+        'service': 180,
+        'inspection': 365,
+    }
+    
+    # Seconds before a worker rebuilds its maintenance schedule from the database
+    MAINTENANCE_SCHEDULE_TTL = int(os.environ.get('MAINTENANCE_SCHEDULE_TTL', 300))
+    
+    # Search: 'auto' picks fts5 (SQLite), trigram (Postgres) or the in-memory trie
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    SEARCH_INDEX_TTL = int(os.environ.get('SEARCH_INDEX_TTL', 300))  # trie rebuild interval (seconds)
+    
+    # Completed trips older than this many days move to trips_archive
+    TRIP_ARCHIVE_DAYS = int(os.environ.get('TRIP_ARCHIVE_DAYS', 90))
+    
+    # Audit log write-behind: flush buffered events every N seconds or once this many are queued
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 100))
+    # Events kept in memory while the database is unreachable; the oldest are dropped beyond this
+    AUDIT_BUFFER_MAX = int(os.environ.get('AUDIT_BUFFER_MAX', 10000))
+    
+    # Rate limits per blueprint ('default' covers the rest), keyed by JWT identity or client IP
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() != 'false'
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE', 'memory')  # or a SQLite file path shared by workers
+    # Proxies in front of the app; Heroku (DYNO is set) routes through exactly one
+    RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 1 if os.environ.get('DYNO') else 0))
+    RATE_LIMITS = {
+        'default': os.environ.get('RATE_LIMIT_DEFAULT', '300/minute'),
+        'auth': os.environ.get('RATE_LIMIT_AUTH', '20/minute'),
+        'search': os.environ.get('RATE_LIMIT_SEARCH', '60/minute'),
+        'reports': os.environ.get('RATE_LIMIT_REPORTS', '30/minute'),
+        'telemetry': os.environ.get('RATE_LIMIT_TELEMETRY', '600/minute'),
+    }
+    
+    # Concurrent requests per worker for expensive endpoints (bcrypt, full-table lists)
+    CONCURRENCY_LIMITS = {
+        'auth.login': 4,
+        'auth.register': 4,
+        'vehicles.get_vehicles': 8,
+        'drivers.get_drivers': 8,
+        'trips.get_trips': 8,
+        'maintenance.get_maintenance': 8,
+        'users.get_users': 8,
+        'search.search_all': 8,
+        'reports.get_lanes': 4,
+    }
+    CONCURRENCY_WAIT_SECONDS = float(os.environ.get('CONCURRENCY_WAIT_SECONDS', 2))
+    
+    # Idempotency-Key: seconds a stored response is replayed, and how long a
+    # request that never finished keeps its key locked
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+    
+    # Telemetry ingest: max pings per request, and seconds a cached last position is trusted
+    # before re-reading it (pings for a vehicle may arrive at another worker)
+    TELEMETRY_MAX_BATCH = int(os.environ.get('TELEMETRY_MAX_BATCH', 50000))
+    # Bodies over TELEMETRY_MAX_BATCH * this many bytes are refused before being read
+    TELEMETRY_MAX_PING_BYTES = int(os.environ.get('TELEMETRY_MAX_PING_BYTES', 256))
+    TELEMETRY_POSITION_TTL = float(os.environ.get('TELEMETRY_POSITION_TTL', 5))
+    
+    # Registration email checks: syntax only by default; optionally also DNS deliverability,
+    # with a short timeout and per-domain caching (seconds)
+    EMAIL_CHECK_DELIVERABILITY = os.environ.get('EMAIL_CHECK_DELIVERABILITY', 'false').lower() == 'true'
+    EMAIL_DNS_TIMEOUT = float(os.environ.get('EMAIL_DNS_TIMEOUT', 1))
+    EMAIL_DNS_CACHE_TTL = int(os.environ.get('EMAIL_DNS_CACHE_TTL', 3600))
+    EMAIL_DNS_UNKNOWN_TTL = int(os.environ.get('EMAIL_DNS_UNKNOWN_TTL', 60))
+    
+    # Background jobs (flask fleet worker): retry backoff base, and seconds without a
+    # heartbeat before a running job is assumed dead and requeued
+    JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 30))
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 300))
+    
+    # Driver compliance: days of license validity a driver needs to take trips, and seconds
+    # before a worker rebuilds its eligible-driver set (to see other workers' status changes)
+    LICENSE_EXPIRY_LEAD_DAYS = int(os.environ.get('LICENSE_EXPIRY_LEAD_DAYS', 0))
+    DRIVER_ELIGIBILITY_TTL = int(os.environ.get('DRIVER_ELIGIBILITY_TTL', 60))
+    
+    # Response cache for hot reads: 'memory' (LRU per worker) or a SQLite file path shared by
+    # workers; total size in bytes, and seconds an entry lives at most (bounds how long another
+    # worker's 'memory' cache can serve a response that has since changed)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() != 'false'
+    RESPONSE_CACHE_STORAGE = os.environ.get('RESPONSE_CACHE_STORAGE', 'memory')
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    
+    # Depot that rows created without one (registrations, CLI, jobs) and legacy rows belong to
+    DEFAULT_DEPOT_ID = int(os.environ.get('DEFAULT_DEPOT_ID', 1))
+    
     # JWT Configuration
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=2)
     
+    # Seconds between a worker's checks for tokens revoked by other workers
+    TOKEN_REVOCATION_REFRESH = float(os.environ.get('TOKEN_REVOCATION_REFRESH', 5))
+    
     # CORS
     CORS_HEADERS = 'Content-Type'
\ No newline at end of file
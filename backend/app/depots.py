@@ -0,0 +1,146 @@
+"""Depot partitioning.
+
+Vehicles, drivers, trips (live and archived), maintenance and users each
+belong to a depot, and audit events and lane rollups carry the depot of the
+records they describe. Access tokens carry the caller's depot in a ``depot``
+claim, and every ORM SELECT, UPDATE and DELETE issued while serving a
+request is scoped to it with ``with_loader_criteria``, so views, bulk
+transitions and ``Model.query.get`` only ever see that depot's rows.
+Lookups of users also match the caller's own row, so role checks work in
+every depot. Admins and the master account may send ``X-Depot: <id>`` to
+work in another depot, or ``X-Depot: all`` for every depot.
+
+Requests without a token, CLI commands and background jobs are unscoped.
+Per-process caches shared by every caller (maintenance schedule, eligible
+drivers, search trie) are built inside ``unscoped()``. Statements on Core
+tables (``Model.__table__``) are never scoped; they are only used with ids
+read through scoped queries. Rows created without a depot are put in the
+caller's depot, or DEFAULT_DEPOT_ID. Locations (the place names lanes
+refer to) and jobs are fleet-wide and not scoped.
+"""
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, or_, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, with_loader_criteria
+from app import db
+from app.models import AuditEvent, Depot, Driver, LaneStat, Maintenance, Trip, TripArchive, User, Vehicle
+from app.models.user import MASTER_PHONE
+
+SCOPED_MODELS = (Vehicle, Driver, Trip, TripArchive, Maintenance, AuditEvent, LaneStat)
+ALL = 'all'
+
+
+@contextmanager
+def unscoped():
+    """Run the enclosed queries across every depot."""
+    session = db.session()
+    previous = session.info.get('all_depots', False)
+    session.info['all_depots'] = True
+    try:
+        yield
+    finally:
+        session.info['all_depots'] = previous
+
+
+def _caller():
+    """(phone, depot, role) from the verified token, or None outside a JWT request."""
+    if not has_request_context():
+        return None
+    try:
+        claims = get_jwt()
+    except RuntimeError:
+        return None  # no token verified (yet) for this request
+    if not claims:
+        return None
+    phone = get_jwt_identity()
+    depot, role = claims.get('depot'), claims.get('role')
+    if depot is None or role is None:
+        # Tokens issued before depots existed
+        with unscoped():
+            row = db.session.execute(
+                select(User.depot_id, User.role).where(User.phone == phone)).first()
+        if row is None:
+            return phone, current_app.config['DEFAULT_DEPOT_ID'], None
+        depot, role = row
+    return phone, depot, role
+
+
+def current_depot():
+    """Depot id the current request is scoped to, or None when unscoped."""
+    if 'depot_scope' in g:
+        return g.depot_scope[1]
+    caller = _caller()
+    if caller is None:
+        return None
+    phone, depot, role = caller
+    requested = request.headers.get('X-Depot', '').strip()
+    if requested and (role == 'admin' or phone == MASTER_PHONE):
+        if requested.lower() == ALL:
+            depot = None
+        elif requested.isdigit():
+            depot = int(requested)
+    g.depot_scope = (phone, depot)
+    return depot
+
+
+def in_scope(column, values):
+    """The ``values`` of a scoped model's key ``column`` that this request can see."""
+    values = set(values)
+    if not values or current_depot() is None:
+        return values
+    return set(db.session.execute(select(column).where(column.in_(values))).scalars())
+
+
+def token_claims(user):
+    """Claims for a user's access tokens (role and depot changes revoke them)."""
+    return {'role': user.role, 'depot': user.depot_id}
+
+
+def ensure_default_depot():
+    """Create the default depot if the table is empty (fresh databases)."""
+    with unscoped():
+        if not db.session.get(Depot, current_app.config['DEFAULT_DEPOT_ID']):
+            db.session.add(Depot(id=current_app.config['DEFAULT_DEPOT_ID'], name='Main'))
+            try:
+                db.session.flush()
+                if db.engine.dialect.name == 'postgresql':
+                    # An explicit id does not advance the sequence behind depots.id
+                    db.session.execute(text(
+                        "SELECT setval(pg_get_serial_sequence('depots', 'id'), (SELECT MAX(id) FROM depots))"
+                    ))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # another process starting up created it first
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _scope_to_depot(orm_execute_state):
+    if not (orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return  # the parent row was already scoped
+    if orm_execute_state.session.info.get('all_depots') or not has_request_context():
+        return
+    depot = current_depot()
+    if depot is None:
+        return
+    phone = g.depot_scope[0]
+    options = [with_loader_criteria(model, lambda cls: cls.depot_id == depot, include_aliases=True)
+               for model in SCOPED_MODELS]
+    options.append(with_loader_criteria(
+        User, lambda cls: or_(cls.depot_id == depot, cls.phone == phone), include_aliases=True))
+    orm_execute_state.statement = orm_execute_state.statement.options(*options)
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_depot(session, flush_context, instances):
+    new = [obj for obj in session.new if isinstance(obj, SCOPED_MODELS + (User,)) and obj.depot_id is None]
+    if not new:
+        return
+    depot = current_depot() if has_request_context() else None
+    if depot is None:
+        depot = current_app.config['DEFAULT_DEPOT_ID']
+    for obj in new:
+        obj.depot_id = depot
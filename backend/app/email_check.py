@@ -0,0 +1,60 @@
+"""Email address validation for registration.
+
+Syntax is always checked offline. Deliverability (the domain has MX or
+A/AAAA records) is only checked when EMAIL_CHECK_DELIVERABILITY is on, and
+then through a per-worker resolver with a short EMAIL_DNS_TIMEOUT. Answers
+are cached per domain: definite ones for EMAIL_DNS_CACHE_TTL seconds,
+inconclusive ones (DNS timed out or unreachable, which are let through)
+for EMAIL_DNS_UNKNOWN_TTL, so a DNS outage costs at most one timeout per
+domain per interval instead of one per registration.
+"""
+import threading
+import time
+from email_validator import EmailNotValidError, caching_resolver, validate_email
+from email_validator.deliverability import validate_email_deliverability
+from flask import current_app
+
+
+class DomainCache:
+    def __init__(self, timeout, ttl, unknown_ttl):
+        self.resolver = caching_resolver(timeout=timeout)
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self._domains = {}  # ascii domain -> (error message or None, expires)
+        self._lock = threading.Lock()
+
+    def check(self, domain, domain_i18n):
+        """Raise EmailNotValidError if ``domain`` does not accept email."""
+        now = time.monotonic()
+        cached = self._domains.get(domain)
+        if cached is None or cached[1] <= now:
+            try:
+                info = validate_email_deliverability(domain, domain_i18n, dns_resolver=self.resolver)
+                error, ttl = None, self.unknown_ttl if 'unknown-deliverability' in info else self.ttl
+            except EmailNotValidError as exc:
+                error, ttl = str(exc), self.ttl
+            cached = (error, now + ttl)
+            with self._lock:
+                if len(self._domains) > 10000:
+                    self._domains.clear()
+                self._domains[domain] = cached
+        if cached[0]:
+            raise EmailNotValidError(cached[0])
+
+
+def _domain_cache():
+    cache = current_app.extensions.get('email_domains')
+    if cache is None:
+        config = current_app.config
+        cache = DomainCache(config['EMAIL_DNS_TIMEOUT'], config['EMAIL_DNS_CACHE_TTL'],
+                            config['EMAIL_DNS_UNKNOWN_TTL'])
+        current_app.extensions['email_domains'] = cache
+    return cache
+
+
+def check_email(address):
+    """Validate ``address``; raises EmailNotValidError."""
+    result = validate_email(address, check_deliverability=False)
+    if current_app.config['EMAIL_CHECK_DELIVERABILITY']:
+        _domain_cache().check(result.ascii_domain, result.domain)
+    return result
@@ -0,0 +1,146 @@
+"""Idempotency-Key support for create/complete endpoints.
+
+A client that may retry a write sends the same ``Idempotency-Key`` header on
+every attempt. The first attempt claims the key (scoped to the caller) and
+runs the view; a successful response is stored compressed in
+``idempotency_keys`` and replayed for IDEMPOTENCY_TTL seconds, so retries
+never run the view twice. Keys are claimed and stored on their own
+connection, outside the view's transaction, so every worker sees them.
+
+The view's own commit also marks its key as done (204, no body) in the
+same transaction as its writes. If storing the response afterwards fails,
+the key therefore stays taken and retries get that 204 instead of running
+the write again.
+
+- a retry while the first attempt is still running gets 409
+- reusing a key for a different request (method, path or body) gets 422
+- failed attempts (non-2xx or an exception) that committed nothing release
+  the key so the client can retry; a claim left behind by a crashed worker
+  expires after IDEMPOTENCY_LOCK_SECONDS
+
+Expired keys are deleted as new ones are claimed.
+"""
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+# Delete expired keys on every Nth claim in a worker
+_PRUNE_EVERY = 100
+_claims = 0
+
+table = IdempotencyKey.__table__
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _claim(key, fingerprint):
+    """Insert an in-progress row for ``key``; returns None if claimed, else the existing row."""
+    global _claims
+    now = datetime.utcnow()
+    lock_until = now + timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_SECONDS'])
+    with db.engine.begin() as conn:
+        _claims += 1
+        if _claims % _PRUNE_EVERY == 0:
+            conn.execute(delete(table).where(table.c.expires_at < now))
+        # A key whose stored response or stale lock has expired can be claimed again
+        conn.execute(delete(table).where(table.c.key == key, table.c.expires_at < now))
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(table).values(
+                key=key, fingerprint=fingerprint, created_at=now, expires_at=lock_until))
+        return None
+    except IntegrityError:
+        with db.engine.connect() as conn:
+            return conn.execute(select(table).where(table.c.key == key)).first()
+
+
+def _store(key, response):
+    """Save the response for replay; on failure the key keeps its done mark."""
+    expires = datetime.utcnow() + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(update(table).where(table.c.key == key).values(
+                status_code=response.status_code,
+                response=zlib.compress(response.get_data()),
+                expires_at=expires))
+    except SQLAlchemyError:
+        current_app.logger.exception('Could not store the response for an idempotency key')
+
+
+@event.listens_for(Session, 'before_commit')
+def _mark_done(session):
+    # Runs inside the view's transaction, so the mark commits with its writes
+    key = session.info.get('idempotency_key')
+    if key is not None:
+        expires = datetime.utcnow() + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+        session.execute(update(table).where(table.c.key == key).values(
+            status_code=204, response=None, expires_at=expires))
+
+
+@event.listens_for(Session, 'after_commit')
+def _committed(session):
+    if session.info.get('idempotency_key') is not None:
+        session.info['idempotency_committed'] = True
+
+
+def _release(key):
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a write view (place under jwt_required)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get(HEADER)
+        if not header:
+            return view(*args, **kwargs)
+        if len(header) > 255:
+            return jsonify({'message': f'{HEADER} must be at most 255 characters'}), 400
+
+        key = _digest(get_jwt_identity(), header)
+        fingerprint = _digest(request.method, request.path, request.get_data())
+        existing = _claim(key, fingerprint)
+        if existing is not None:
+            if existing.fingerprint != fingerprint:
+                return jsonify({'message': f'{HEADER} was already used for a different request'}), 422
+            if existing.status_code is None:
+                return jsonify({'message': f'A request with this {HEADER} is still in progress'}), 409
+            body = zlib.decompress(existing.response) if existing.response is not None else b''
+            replay = Response(body, status=existing.status_code, mimetype='application/json')
+            replay.headers['Idempotent-Replayed'] = 'true'
+            return replay
+
+        session = db.session()
+        session.info['idempotency_key'] = key
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(key)
+            raise
+        finally:
+            session.info.pop('idempotency_key', None)
+            committed = session.info.pop('idempotency_committed', False)
+        # Once the view has committed, its response is the outcome to replay
+        if committed or 200 <= response.status_code < 300:
+            _store(key, response)
+        else:
+            _release(key)
+        return response
+    return wrapper
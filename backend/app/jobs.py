@@ -0,0 +1,317 @@
+"""Background jobs.
+
+Long-running work (recomputing mileage, archiving, rebuilding rollups) is
+queued as a row in ``jobs`` and run by ``flask fleet worker`` processes, so
+it never holds a web request or runs into the gunicorn timeout. The
+database is the only broker.
+
+- claiming: ``SELECT ... FOR UPDATE SKIP LOCKED`` on Postgres; on SQLite a
+  file lock next to the database serialises claims. Either way the claim is
+  a conditional UPDATE, so two workers can never run the same job.
+- progress: tasks call ``job.progress(fraction, message)``, committed on a
+  separate connection so pollers see it immediately
+- heartbeat: a running job's heartbeat is refreshed in the background;
+  jobs whose worker died are requeued after JOB_STALE_SECONDS
+- retries: a failed attempt is retried after JOB_RETRY_DELAY * 2^(attempt-1)
+  seconds until max_attempts, then the job is marked failed
+- arguments: each task declares the types of the arguments it accepts;
+  ``enqueue`` rejects anything else, so bad arguments never reach a worker
+
+Every task runs unscoped, across all depots.
+"""
+import contextlib
+import os
+import signal
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import Job
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+TASKS = {}
+ARG_TYPES = {}  # task name -> {argument: (type, minimum)}
+
+
+def task(name, **arg_types):
+    """Register ``func(job, **args)`` as a job that can be queued by name.
+
+    ``arg_types`` gives each (optional) argument as ``(type, minimum)``.
+    """
+    def register(func):
+        TASKS[name] = func
+        ARG_TYPES[name] = arg_types
+        return func
+    return register
+
+
+def validate_args(name, args):
+    """Raise ValueError unless ``args`` fit the arguments task ``name`` declares."""
+    accepted = ARG_TYPES[name]
+    for key, value in args.items():
+        if key not in accepted:
+            allowed = ', '.join(sorted(accepted)) or 'none'
+            raise ValueError(f'{name} does not take {key!r} (arguments: {allowed})')
+        expected, minimum = accepted[key]
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError(f'{key} must be of type {expected.__name__}')
+        if value < minimum:
+            raise ValueError(f'{key} must be at least {minimum}')
+
+
+def enqueue(name, args=None, created_by=None, max_attempts=3):
+    """Queue a job and commit; returns the Job.
+
+    Raises KeyError for an unknown task and ValueError for invalid ``args``.
+    """
+    if name not in TASKS:
+        raise KeyError(name)
+    validate_args(name, args or {})
+    job = Job(name=name, args=args or {}, created_by=created_by, max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _touch(job_id, **values):
+    """Best-effort update of a running job on its own connection.
+
+    On SQLite this waits for the task's own open write transaction, if any;
+    a missed progress note or heartbeat is not worth failing the job for.
+    """
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(update(Job.__table__).where(Job.__table__.c.id == job_id).values(**values))
+    except SQLAlchemyError:
+        current_app.logger.warning('Could not update job %s', job_id, exc_info=True)
+
+
+class JobContext:
+    """Handle passed to a running task."""
+
+    def __init__(self, job_id):
+        self.id = job_id
+
+    def progress(self, fraction, message=None):
+        values = {'progress': max(0.0, min(1.0, fraction)), 'heartbeat_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:255]
+        _touch(self.id, **values)
+
+
+def _lock_file(handle, lock):
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_EX if lock else fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK if lock else msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _claim_lock():
+    """Serialise claims on SQLite, which has no SKIP LOCKED; a no-op elsewhere."""
+    if db.engine.dialect.name != 'sqlite':
+        yield
+        return
+    database = db.engine.url.database
+    path = (database if database and database != ':memory:' else 'fleet') + '.jobs.lock'
+    with open(path, 'a+b') as handle:
+        _lock_file(handle, True)
+        try:
+            yield
+        finally:
+            _lock_file(handle, False)
+
+
+def claim(worker_id):
+    """Take the oldest runnable queued job for ``worker_id``; returns its id or None."""
+    now = datetime.utcnow()
+    with _claim_lock():
+        candidate = (
+            select(Job.id)
+            .where(Job.status == 'queued', Job.run_at <= now)
+            .order_by(Job.run_at, Job.id)
+            .limit(1)
+        )
+        if db.engine.dialect.name == 'postgresql':
+            candidate = candidate.with_for_update(skip_locked=True)
+        job_id = db.session.execute(candidate).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, started_at=now, heartbeat_at=now,
+                    attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+    return job_id if claimed else None
+
+
+def requeue_stale():
+    """Put running jobs whose worker stopped heartbeating back in the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_STALE_SECONDS'])
+    stale = db.session.execute(
+        select(Job).where(Job.status == 'running', Job.heartbeat_at < cutoff)
+    ).scalars().all()
+    for job in stale:
+        _finish_attempt(job, 'Worker stopped responding')
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+
+def _finish_attempt(job, error):
+    """Schedule a retry of a failed attempt, or mark the job failed."""
+    job.error = error
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        delay = current_app.config['JOB_RETRY_DELAY'] * 2 ** max(job.attempts - 1, 0)
+        job.status = 'queued'
+        job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+    else:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+
+
+def _heartbeat(app, job_id, stop, interval):
+    with app.app_context():
+        while not stop.wait(interval):
+            _touch(job_id, heartbeat_at=datetime.utcnow())
+
+
+def run_job(job_id):
+    """Run a claimed job to completion or failure."""
+    app = current_app._get_current_object()
+    job = db.session.get(Job, job_id)
+    func = TASKS.get(job.name)
+    stop = threading.Event()
+    interval = max(current_app.config['JOB_STALE_SECONDS'] / 3, 1)
+    beat = threading.Thread(target=_heartbeat, args=(app, job_id, stop, interval),
+                            name=f'job-{job_id}-heartbeat', daemon=True)
+    beat.start()
+    try:
+        if func is None:
+            raise KeyError(f'Unknown job {job.name!r}')
+        result = func(JobContext(job_id), **(job.args or {}))
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        current_app.logger.exception('Job %s (%s) failed', job_id, job.name)
+        _finish_attempt(job, traceback.format_exc(limit=5)[-4000:])
+    else:
+        job = db.session.get(Job, job_id)
+        job.status = 'succeeded'
+        job.progress = 1.0
+        job.result = result
+        job.error = None
+        job.locked_by = None
+        job.finished_at = datetime.utcnow()
+    finally:
+        stop.set()
+        beat.join()
+    db.session.commit()
+    return job
+
+
+def run_worker(poll_interval=1.0, burst=False):
+    """Claim and run jobs until stopped (SIGTERM/SIGINT finish the current job first).
+
+    With ``burst`` the worker exits once the queue is empty. Returns the
+    number of jobs run.
+    """
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, stop)
+
+    ran = 0
+    current_app.logger.info('Job worker %s started', worker_id)
+    while not stopping.is_set():
+        requeue_stale()
+        job_id = claim(worker_id)
+        if job_id is None:
+            db.session.remove()
+            if burst:
+                break
+            stopping.wait(poll_interval)
+            continue
+        job = run_job(job_id)
+        current_app.logger.info('Job %s (%s) %s', job.id, job.name, job.status)
+        db.session.remove()
+        ran += 1
+    return ran
+
+
+# Tasks
+
+@task('recompute-mileage')
+def _recompute_mileage(job):
+    from app.mileage import recompute_mileage
+    vehicles, drivers = recompute_mileage()
+    return {'vehicles': vehicles, 'drivers': drivers}
+
+
+@task('enqueue-service')
+def _enqueue_service(job):
+    from app.mileage import enqueue_mileage_service
+    created = enqueue_mileage_service(current_app.config['SERVICE_INTERVALS_KM'])
+    return {'scheduled': created}
+
+
+@task('backfill-lanes', batch_size=(int, 1))
+def _backfill_lanes(job, batch_size=1000):
+    from app.lanes import backfill_lanes
+    locations, lanes = backfill_lanes(batch_size)
+    return {'locations': locations, 'lanes': lanes}
+
+
+@task('archive-trips', days=(int, 0), batch_size=(int, 1))
+def _archive_trips(job, days=None, batch_size=1000):
+    from sqlalchemy import func
+    from app.archive import archive_trips
+    from app.models import Trip
+    if days is None:
+        days = current_app.config['TRIP_ARCHIVE_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = db.session.query(func.count(Trip.id)).filter(
+        Trip.status == 'completed', Trip.completed_at < cutoff).scalar()
+    moved = 0
+    while True:
+        batch = archive_trips(days, batch_size, max_batches=1)
+        if not batch:
+            break
+        moved += batch
+        job.progress(moved / total if total else 1, f'{moved} of {total} trips archived')
+    return {'archived': moved}
+
+
+@task('sweep-licenses')
+def _sweep_licenses(job):
+    from app.compliance import sweep_licenses
+    suspended, reinstated = sweep_licenses()
+    db.session.commit()
+    return {'suspended': len(suspended), 'reinstated': len(reinstated)}
+
+
+@task('rebuild-search')
+def _rebuild_search(job):
+    from app.search import get_search_backend
+    backend = get_search_backend()
+    backend.init(rebuild=True)
+    return {'backend': backend.name}
@@ -0,0 +1,223 @@
+"""Origin-destination lane analytics.
+
+Free-text trip origins/destinations are interned into the ``locations``
+dictionary under a normalised key, shared by every depot, and completed
+trips are rolled up into ``lane_stats`` (trip count and distance per lane
+per month, kept separately for each trip's depot) as they complete. Reports
+read the rollup only, never the raw trips, scoped like any depot's data.
+"""
+import re
+from flask import current_app
+from sqlalchemy import bindparam, delete, event, func, insert, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+from app import db
+from app.models import LaneStat, Location, Trip, TripArchive
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+', re.UNICODE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_place(name):
+    """'  Mumbai  Port, ' -> 'mumbai port'"""
+    return _SPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', (name or '').lower())).strip()
+
+
+def _dialect_insert(model):
+    """INSERT supporting on_conflict_* on SQLite and Postgres."""
+    name = db.engine.dialect.name
+    if name == 'postgresql':
+        return postgresql.insert(model)
+    if name == 'sqlite':
+        return sqlite.insert(model)
+    return None
+
+
+def _period(column):
+    """YYYY-MM of a date column, in the database's own dialect."""
+    name = db.engine.dialect.name
+    if name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    if name == 'mysql':
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def _location_cache():
+    return current_app.extensions.setdefault('location_ids', {})
+
+
+def intern_location(name):
+    """Id of the location matching ``name``, created if new (caller commits).
+
+    Ids are cached per worker once the transaction that saw them commits.
+    """
+    key = normalize_place(name)
+    cache = _location_cache()
+    if key in cache:
+        return cache[key]
+
+    loc_id = db.session.execute(select(Location.id).where(Location.key == key)).scalar()
+    if loc_id is None:
+        values = {'key': key, 'name': (name or '').strip()[:255]}
+        stmt = _dialect_insert(Location)
+        if stmt is not None:
+            # A concurrent request may intern the same place; keep whichever won
+            db.session.execute(stmt.values(**values).on_conflict_do_nothing(index_elements=['key']))
+        else:
+            db.session.add(Location(**values))
+            db.session.flush()
+        loc_id = db.session.execute(select(Location.id).where(Location.key == key)).scalar()
+
+    db.session.info.setdefault('interned_locations', {})[key] = loc_id
+    return loc_id
+
+
+@event.listens_for(Session, 'after_commit')
+def _cache_interned_locations(session):
+    interned = session.info.pop('interned_locations', None)
+    if interned:
+        _location_cache().update(interned)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_interned_locations(session, previous_transaction):
+    session.info.pop('interned_locations', None)
+
+
+def record_lane(trip):
+    """Add a just-completed trip to its lane's monthly rollup (caller commits)."""
+    record_lanes([trip])
+
+
+def record_lanes(trips):
+    """Add just-completed trips to their lanes' monthly rollups (caller commits).
+
+    Trips on the same lane and month are summed first, then each lane is
+    upserted once.
+    """
+    rollup = {}
+    for trip in trips:
+        origin_id = trip.origin_id or intern_location(trip.origin)
+        destination_id = trip.destination_id or intern_location(trip.destination)
+        if trip.origin_id is None or trip.destination_id is None:
+            db.session.execute(
+                update(Trip)
+                .where(Trip.id == trip.id)
+                .values(origin_id=origin_id, destination_id=destination_id)
+                .execution_options(synchronize_session='fetch')
+            )
+        key = (trip.depot_id, origin_id, destination_id, trip.date.strftime('%Y-%m'))
+        count, distance = rollup.get(key, (0, 0))
+        rollup[key] = (count + 1, distance + (trip.distance or 0))
+    if not rollup:
+        return
+
+    rows = [{'depot_id': depot_id, 'origin_id': origin_id, 'destination_id': destination_id,
+             'period': period, 'trip_count': count, 'total_distance': distance}
+            for (depot_id, origin_id, destination_id, period), (count, distance) in rollup.items()]
+    stmt = _dialect_insert(LaneStat)
+    if stmt is not None:
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['depot_id', 'origin_id', 'destination_id', 'period'],
+            set_={'trip_count': LaneStat.trip_count + stmt.excluded.trip_count,
+                  'total_distance': LaneStat.total_distance + stmt.excluded.total_distance},
+        ), rows)
+        return
+
+    for row in rows:
+        changed = db.session.execute(
+            update(LaneStat)
+            .filter_by(depot_id=row['depot_id'], origin_id=row['origin_id'],
+                       destination_id=row['destination_id'], period=row['period'])
+            .values(trip_count=LaneStat.trip_count + row['trip_count'],
+                    total_distance=LaneStat.total_distance + row['total_distance'])
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not changed:
+            db.session.add(LaneStat(**row))
+
+
+def backfill_lanes(batch_size=1000):
+    """Intern locations for trips missing them and rebuild the lane rollup.
+
+    Works through distinct unmatched names in batches, committing after
+    each, so it can be interrupted and rerun. Archived trips are included.
+    Returns (locations, lanes).
+    """
+    for trips in (Trip.__table__, TripArchive.__table__):
+        for column, id_column in ((trips.c.origin, trips.c.origin_id),
+                                  (trips.c.destination, trips.c.destination_id)):
+            while True:
+                names = db.session.execute(
+                    select(column).where(id_column.is_(None)).distinct().limit(batch_size)
+                ).scalars().all()
+                if not names:
+                    break
+                db.session.execute(
+                    update(trips)
+                    .where(column == bindparam('raw_name'), id_column.is_(None))
+                    .values({id_column.name: bindparam('location_id')}),
+                    [{'raw_name': name, 'location_id': intern_location(name)} for name in names],
+                )
+                db.session.commit()
+
+    completed = union_all(*[
+        select(t.depot_id, t.origin_id, t.destination_id, t.date, t.distance)
+        .where(t.status == 'completed', t.origin_id.isnot(None), t.destination_id.isnot(None))
+        for t in (Trip, TripArchive)
+    ]).subquery()
+    period = _period(completed.c.date)
+    db.session.execute(delete(LaneStat))
+    db.session.execute(insert(LaneStat).from_select(
+        ['depot_id', 'origin_id', 'destination_id', 'period', 'trip_count', 'total_distance'],
+        select(completed.c.depot_id, completed.c.origin_id, completed.c.destination_id, period,
+               func.count(), func.coalesce(func.sum(completed.c.distance), 0))
+        .group_by(completed.c.depot_id, completed.c.origin_id, completed.c.destination_id, period)
+    ))
+    db.session.commit()
+    return (db.session.query(func.count(Location.id)).scalar(),
+            db.session.query(func.count()).select_from(LaneStat).scalar())
+
+
+def top_lanes(period=None, start=None, end=None, limit=10, sort='count'):
+    """Busiest lanes from the rollup, optionally within a YYYY-MM period range.
+
+    Lanes are summed over the depots in scope (one, or every depot when unscoped).
+    """
+    if period:
+        start = end = period
+
+    trip_count = func.sum(LaneStat.trip_count).label('trip_count')
+    total_distance = func.sum(LaneStat.total_distance).label('total_distance')
+    order = {
+        'count': trip_count,
+        'distance': total_distance,
+        'avg_distance': total_distance / trip_count,
+    }[sort]
+
+    origin, destination = aliased(Location), aliased(Location)
+    stmt = (
+        select(LaneStat.origin_id, LaneStat.destination_id, origin.name, destination.name,
+               trip_count, total_distance)
+        .join(origin, origin.id == LaneStat.origin_id)
+        .join(destination, destination.id == LaneStat.destination_id)
+        .group_by(LaneStat.origin_id, LaneStat.destination_id, origin.name, destination.name)
+        .order_by(order.desc())
+        .limit(limit)
+    )
+    if start:
+        stmt = stmt.where(LaneStat.period >= start)
+    if end:
+        stmt = stmt.where(LaneStat.period <= end)
+
+    return [{
+        'origin_id': origin_id,
+        'destination_id': destination_id,
+        'origin': origin_name,
+        'destination': destination_name,
+        'trip_count': count,
+        'total_distance': distance,
+        'avg_distance': distance / count if count else 0,
+    } for origin_id, destination_id, origin_name, destination_name, count, distance
+        in db.session.execute(stmt)]
@@ -0,0 +1,137 @@
+"""Odometer accrual and mileage-based service planning.
+
+Vehicle.mileage and Driver.odometer grow by each completed trip's distance.
+The same rounding (SQL ROUND) is used for accrual and for the recompute so
+the two always agree.
+"""
+from datetime import datetime
+from sqlalchemy import and_, cast, exists, func, insert, literal, select
+from app import db
+from app.models import Driver, Maintenance, Trip, TripArchive, Vehicle
+from app.transitions import transition
+from app.audit import stage
+
+
+def accrue_trip_distance(trip):
+    """Add a completed trip's distance to its vehicle and driver (caller commits)."""
+    accrue_trips_distance([trip])
+
+
+def accrue_trips_distance(trips):
+    """Add completed trips' distances to their vehicles and drivers (caller commits).
+
+    One UPDATE per table, each row adding the sum of its own trips.
+    """
+    ids = [trip.id for trip in trips]
+    if not ids:
+        return
+
+    def total(column, key):
+        return func.coalesce(
+            select(func.sum(cast(func.round(func.coalesce(Trip.distance, 0)), db.Integer)))
+            .where(Trip.id.in_(ids), column == key)
+            .scalar_subquery(), 0)
+
+    transition(Vehicle,
+               Vehicle.vehicle_number.in_({trip.vehicle_number for trip in trips}),
+               mileage=func.coalesce(Vehicle.mileage, 0) + total(Trip.vehicle_number, Vehicle.vehicle_number))
+    transition(Driver,
+               Driver.phone.in_({trip.driver_phone for trip in trips}),
+               odometer=func.coalesce(Driver.odometer, 0) + total(Trip.driver_phone, Driver.phone))
+
+
+def _completed_distance(model, column, key):
+    """Correlated subquery: total rounded distance of completed trips where ``column == key``."""
+    return (
+        select(func.coalesce(func.sum(cast(func.round(model.distance), db.Integer)), 0))
+        .where(model.status == 'completed', getattr(model, column) == key)
+        .scalar_subquery()
+    )
+
+
+def recompute_mileage():
+    """Rebuild Vehicle.mileage and Driver.odometer from completed trips.
+
+    One grouped UPDATE per table over hot and archived trips, recorded in
+    the audit log like any other transition; any manually entered mileage is
+    replaced by the trip total. Returns (vehicles, drivers) row counts.
+    """
+    def total(column, key):
+        return (_completed_distance(Trip, column, key)
+                + _completed_distance(TripArchive, column, key))
+
+    vehicles = transition(Vehicle, mileage=total('vehicle_number', Vehicle.vehicle_number))
+    drivers = transition(Driver, odometer=total('driver_phone', Driver.phone))
+    db.session.commit()
+    return vehicles, drivers
+
+
+def enqueue_mileage_service(intervals, depot_id=None):
+    """Create pending Maintenance records for vehicles past a service interval.
+
+    ``intervals`` maps maintenance type -> km between services. A vehicle is
+    due when it has driven at least that far since its last record of the type
+    and has no open (not completed) record of that type. One INSERT ... SELECT
+    per type, limited to ``depot_id``'s vehicles when given; returns the number
+    of records created. Each record is logged under its new id where the
+    database supports RETURNING.
+    """
+    now = datetime.utcnow()
+    created = 0
+    for maint_type, interval_km in intervals.items():
+        last_mileage = (
+            select(func.coalesce(func.max(Maintenance.mileage), 0))
+            .where(Maintenance.vehicle_number == Vehicle.vehicle_number,
+                   Maintenance.type == maint_type)
+            .scalar_subquery()
+        )
+        has_open = exists().where(
+            and_(Maintenance.vehicle_number == Vehicle.vehicle_number,
+                 Maintenance.type == maint_type,
+                 Maintenance.status != 'completed')
+        )
+        due = select(
+            Vehicle.depot_id,
+            Vehicle.vehicle_number,
+            literal(maint_type),
+            literal(f'Scheduled {maint_type} (every {interval_km} km)'),
+            literal(now.date()),
+            literal(1),
+            literal(0.0),
+            literal('pending'),
+            Vehicle.mileage,
+            literal(1),
+            literal(now),
+            literal(now),
+            literal(now),
+        ).where(
+            Vehicle.status != 'inactive',
+            *([Vehicle.depot_id == depot_id] if depot_id is not None else []),
+            func.coalesce(Vehicle.mileage, 0) - last_mileage >= interval_km,
+            ~has_open,
+        )
+        stmt = insert(Maintenance).from_select(
+            ['depot_id', 'vehicle_number', 'type', 'description', 'date', 'duration_days', 'cost',
+             'status', 'mileage', 'version', 'start_date', 'created_at', 'updated_at'],
+            due,
+        )
+        if db.engine.dialect.insert_returning:
+            rows = db.session.execute(stmt.returning(
+                Maintenance.id, Maintenance.depot_id, Maintenance.vehicle_number, Maintenance.mileage)).all()
+            for maint_id, maint_depot, vehicle_number, mileage in rows:
+                stage(db.session(), 'create', Maintenance.__tablename__, maint_id, {
+                    'vehicle_number': [None, vehicle_number],
+                    'type': [None, maint_type],
+                    'status': [None, 'pending'],
+                    'mileage': [None, mileage],
+                }, maint_depot)
+            created += len(rows)
+        else:
+            count = db.session.execute(stmt).rowcount
+            if count:
+                stage(db.session(), 'create', Maintenance.__tablename__, None,
+                      {'type': [None, maint_type], 'status': [None, 'pending'], 'count': [None, count]},
+                      depot_id)
+            created += count
+    db.session.commit()
+    return created
@@ -1,7 +1,16 @@
+from .depot import Depot
 from .user import User
 from .vehicle import Vehicle
 from .driver import Driver
 from .trip import Trip
+from .trip_archive import TripArchive
 from .maintenance import Maintenance
+from .location import Location
+from .lane_stat import LaneStat
+from .audit_event import AuditEvent
+from .revoked_token import RevokedToken
+from .idempotency_key import IdempotencyKey
+from .telemetry_ping import TelemetryPing
+from .job import Job
 
-__all__ = ['User', 'Vehicle', 'Driver', 'Trip', 'Maintenance']
+__all__ = ['Depot', 'User', 'Vehicle', 'Driver', 'Trip', 'TripArchive', 'Maintenance', 'Location', 'LaneStat', 'AuditEvent', 'RevokedToken', 'IdempotencyKey', 'TelemetryPing', 'Job']
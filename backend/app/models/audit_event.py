@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+
+class AuditEvent(db.Model):
+    """Append-only record of a change to a vehicle, driver, trip, maintenance record or user"""
+    __tablename__ = 'audit_events'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    depot_id = db.Column(db.Integer, nullable=True)  # depot of the changed record; None for fleet-wide
+    actor = db.Column(db.String(20), nullable=True)  # JWT identity (phone); None for system/anonymous
+    action = db.Column(db.String(20), nullable=False)  # create, update, delete
+    entity = db.Column(db.String(50), nullable=False)  # table name
+    entity_id = db.Column(db.String(50), nullable=True)
+    changes = db.Column(db.JSON, nullable=True)  # {field: [before, after]}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_audit_events_entity', 'entity', 'entity_id', 'id'),
+        db.Index('ix_audit_events_actor', 'actor', 'id'),
+        db.Index('ix_audit_events_depot', 'depot_id', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'depot_id': self.depot_id,
+            'actor': self.actor,
+            'action': self.action,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'changes': self.changes,
+            'created_at': self.created_at.isoformat()
+        }
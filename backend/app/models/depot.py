@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+class Depot(db.Model):
+    """A site that owns a partition of the fleet (see app/depots.py)"""
+    __tablename__ = 'depots'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at.isoformat()
+        }
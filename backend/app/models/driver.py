@@ -5,14 +5,20 @@ class Driver(db.Model):
     __tablename__ = 'drivers'
     
     phone = db.Column(db.String(20), primary_key=True, nullable=False)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), nullable=False, server_default='1')
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True)
     license_number = db.Column(db.String(50), unique=True, nullable=False)
-    license_expiry = db.Column(db.Date)
-    status = db.Column(db.String(20), default='available')  # available, assigned, inactive
+    license_expiry = db.Column(db.Date, index=True)
+    status = db.Column(db.String(20), default='available')  # available, assigned, inactive, suspended (license lapsed)
+    odometer = db.Column(db.Integer, default=0, server_default='0')  # distance driven on completed trips
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_drivers_depot_status', 'depot_id', 'status'),
+    )
+    
     # Relationships
     vehicles = db.relationship('Vehicle', backref='driver', lazy=True)
     
@@ -20,11 +26,13 @@ class Driver(db.Model):
         return {
             'id': self.phone,
             'phone': self.phone,
+            'depot_id': self.depot_id,
             'license_number': self.license_number,
             'name': self.name,
             'email': self.email,
             'license_expiry': self.license_expiry.isoformat() if self.license_expiry else None,
             'status': self.status,
+            'odometer': self.odometer,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
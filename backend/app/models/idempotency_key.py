@@ -0,0 +1,13 @@
+from datetime import datetime
+from app import db
+
+class IdempotencyKey(db.Model):
+    """Stored response of a create/complete request, replayed when the client retries with the same key"""
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of caller + Idempotency-Key header
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)  # None while the first request is running
+    response = db.Column(db.LargeBinary, nullable=True)  # zlib-compressed body
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,48 @@
+from datetime import datetime
+from app import db
+
+class Job(db.Model):
+    """Background job run by `flask fleet worker` (see app/jobs.py)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(50), nullable=False)  # registered task name
+    args = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress = db.Column(db.Float, nullable=False, default=0)  # 0..1
+    message = db.Column(db.String(255), nullable=True)  # latest progress note
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)  # last failure
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not before (retry backoff)
+    locked_by = db.Column(db.String(100), nullable=True)  # worker id while running
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    created_by = db.Column(db.String(20), nullable=True)  # phone
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    # Workers look for the oldest runnable queued job
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'args': self.args,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat(),
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
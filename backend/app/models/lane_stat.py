@@ -0,0 +1,27 @@
+from app import db
+
+class LaneStat(db.Model):
+    """Completed-trip rollup per depot, origin -> destination lane and month"""
+    __tablename__ = 'lane_stats'
+    
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), primary_key=True, server_default='1')
+    origin_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    destination_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    trip_count = db.Column(db.Integer, nullable=False, default=0)
+    total_distance = db.Column(db.Float, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_lane_stats_period_count', 'period', 'trip_count'),
+    )
+    
+    def to_dict(self):
+        return {
+            'depot_id': self.depot_id,
+            'origin_id': self.origin_id,
+            'destination_id': self.destination_id,
+            'period': self.period,
+            'trip_count': self.trip_count,
+            'total_distance': self.total_distance,
+            'avg_distance': self.total_distance / self.trip_count if self.trip_count else 0
+        }
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+class Location(db.Model):
+    __tablename__ = 'locations'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    key = db.Column(db.String(255), unique=True, nullable=False)  # normalised name, e.g. "mumbai port"
+    name = db.Column(db.String(255), nullable=False)  # first spelling seen
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'name': self.name,
+            'created_at': self.created_at.isoformat()
+        }
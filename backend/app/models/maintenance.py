@@ -5,28 +5,40 @@ class Maintenance(db.Model):
     __tablename__ = 'maintenance'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), nullable=False, server_default='1')
     vehicle_number = db.Column(db.String(50), db.ForeignKey('vehicles.vehicle_number'), nullable=False)
     type = db.Column(db.String(100), nullable=False)  # oil change, repair, service, etc.
     description = db.Column(db.Text, nullable=True)
     date = db.Column(db.Date, nullable=False)
     duration_days = db.Column(db.Integer, default=1)  # How many days the maintenance will take
     cost = db.Column(db.Float, default=0)
+    mileage = db.Column(db.Integer, nullable=True)  # Vehicle odometer reading when recorded
     status = db.Column(db.String(20), default='pending')  # pending, in_progress, completed
     start_date = db.Column(db.DateTime, default=datetime.utcnow)  # When maintenance started
     end_date = db.Column(db.DateTime, nullable=True)  # When maintenance will be complete
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # optimistic lock
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_maintenance_vehicle_type', 'vehicle_number', 'type'),
+        db.Index('ix_maintenance_depot_vehicle', 'depot_id', 'vehicle_number'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+    
     def to_dict(self):
         return {
             'id': self.id,
+            'depot_id': self.depot_id,
             'vehicle_number': self.vehicle_number,
             'type': self.type,
             'description': self.description,
             'date': self.date.isoformat() if self.date else None,
             'duration_days': self.duration_days,
             'cost': self.cost,
+            'mileage': self.mileage,
             'status': self.status,
+            'version': self.version,
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat() if self.end_date else None,
             'created_at': self.created_at.isoformat(),
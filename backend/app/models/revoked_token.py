@@ -0,0 +1,23 @@
+from datetime import datetime
+from app import db
+
+class RevokedToken(db.Model):
+    """A revoked JWT (by jti), or every token of a user issued up to a point in time"""
+    __tablename__ = 'revoked_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    jti = db.Column(db.String(36), unique=True, nullable=True)  # single token (logout)
+    phone = db.Column(db.String(20), nullable=True)  # token subject
+    issued_before = db.Column(db.DateTime, nullable=True)  # all of phone's tokens issued before this
+    expires_at = db.Column(db.DateTime, nullable=False)  # the entry can be pruned after this
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'phone': self.phone,
+            'issued_before': self.issued_before.isoformat() if self.issued_before else None,
+            'expires_at': self.expires_at.isoformat(),
+            'created_at': self.created_at.isoformat()
+        }
@@ -0,0 +1,26 @@
+from app import db
+
+class TelemetryPing(db.Model):
+    """GPS ping from a vehicle. Append-only: written in bulk, never updated"""
+    __tablename__ = 'telemetry_pings'
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    vehicle_number = db.Column(db.String(50), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False)  # UTC time of the fix
+    lat = db.Column(db.Float, nullable=False)
+    lon = db.Column(db.Float, nullable=False)
+    speed = db.Column(db.Float, nullable=True)  # km/h
+    
+    # The only index: a vehicle's track in time order (trip distance, last position)
+    __table_args__ = (
+        db.Index('ix_telemetry_pings_vehicle_ts', 'vehicle_number', 'ts'),
+    )
+    
+    def to_dict(self):
+        return {
+            'vehicle_number': self.vehicle_number,
+            'ts': self.ts.isoformat(),
+            'lat': self.lat,
+            'lon': self.lon,
+            'speed': self.speed
+        }
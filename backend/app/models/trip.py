@@ -5,20 +5,33 @@ class Trip(db.Model):
     __tablename__ = 'trips'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    vehicle_number = db.Column(db.String(50), nullable=False)
-    driver_phone = db.Column(db.String(20), nullable=False)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), nullable=False, server_default='1')
+    vehicle_number = db.Column(db.String(50), nullable=False, index=True)
+    driver_phone = db.Column(db.String(20), nullable=False, index=True)
     origin = db.Column(db.String(255), nullable=False)
     destination = db.Column(db.String(255), nullable=False)
+    origin_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True, index=True)
+    destination_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True, index=True)
     date = db.Column(db.Date, nullable=False)
     distance = db.Column(db.Float, default=0)
     fuel_type = db.Column(db.String(20), default='petrol')  # petrol, diesel, electric
     status = db.Column(db.String(20), default='active')  # active, completed
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # optimistic lock
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_trips_status_completed_at', 'status', 'completed_at'),
+        db.Index('ix_trips_depot_status', 'depot_id', 'status'),
+        # Never hand out an id again once its trip has moved to trips_archive
+        {'sqlite_autoincrement': True},
+    )
+    __mapper_args__ = {'version_id_col': version}
+    
     def to_dict(self):
         return {
             'id': self.id,
+            'depot_id': self.depot_id,
             'vehicle_number': self.vehicle_number,
             'driver_phone': self.driver_phone,
             'origin': self.origin,
@@ -27,6 +40,7 @@ class Trip(db.Model):
             'distance': self.distance,
             'fuel_type': self.fuel_type,
             'status': self.status,
+            'version': self.version,
             'created_at': self.created_at.isoformat(),
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
@@ -0,0 +1,46 @@
+from datetime import datetime
+from app import db
+
+class TripArchive(db.Model):
+    """Completed trips moved out of the hot trips table (see app/archive.py)"""
+    __tablename__ = 'trips_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # original trips.id
+    depot_id = db.Column(db.Integer, nullable=False, server_default='1')
+    vehicle_number = db.Column(db.String(50), nullable=False, index=True)
+    driver_phone = db.Column(db.String(20), nullable=False, index=True)
+    origin = db.Column(db.String(255), nullable=False)
+    destination = db.Column(db.String(255), nullable=False)
+    origin_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True)
+    destination_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    distance = db.Column(db.Float, default=0)
+    fuel_type = db.Column(db.String(20), default='petrol')
+    status = db.Column(db.String(20), default='completed')
+    version = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_trips_archive_depot_completed_at', 'depot_id', 'completed_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'depot_id': self.depot_id,
+            'vehicle_number': self.vehicle_number,
+            'driver_phone': self.driver_phone,
+            'origin': self.origin,
+            'destination': self.destination,
+            'date': self.date.isoformat() if self.date else None,
+            'distance': self.distance,
+            'fuel_type': self.fuel_type,
+            'status': self.status,
+            'version': self.version,
+            'created_at': self.created_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'archived': True,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
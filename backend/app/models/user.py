@@ -1,5 +1,6 @@
 from datetime import datetime
 from app import db, bcrypt
+from app.concurrency import run_blocking
 
 MASTER_PHONE = '+9868995742'
 
@@ -7,26 +8,32 @@ class User(db.Model):
     __tablename__ = 'users'
     
     phone = db.Column(db.String(20), primary_key=True, nullable=False)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), nullable=False, server_default='1')
     username = db.Column(db.String(80), nullable=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), default='user')  # admin, manager, user, driver
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_users_depot_role', 'depot_id', 'role'),
+    )
+    
     @property
     def is_master(self):
         return self.phone == MASTER_PHONE
     
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = run_blocking(bcrypt.generate_password_hash, password).decode('utf-8')
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return run_blocking(bcrypt.check_password_hash, self.password_hash, password)
     
     def to_dict(self):
         return {
             'id': self.phone,
             'phone': self.phone,
+            'depot_id': self.depot_id,
             'username': self.username,
             'email': self.email,
             'role': self.role,
@@ -5,6 +5,7 @@ class Vehicle(db.Model):
     __tablename__ = 'vehicles'
     
     vehicle_number = db.Column(db.String(50), primary_key=True, nullable=False)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'), nullable=False, server_default='1')
     make = db.Column(db.String(50))
     model = db.Column(db.String(50))
     license_plate = db.Column(db.String(30))
@@ -12,22 +13,30 @@ class Vehicle(db.Model):
     mileage = db.Column(db.Integer, default=0)
     status = db.Column(db.String(20), default='active')  # active, maintenance, inactive
     maintenance_end_date = db.Column(db.DateTime, nullable=True)  # When maintenance will be complete
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # optimistic lock
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     driver_phone = db.Column(db.String(20), db.ForeignKey('drivers.phone'), nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_vehicles_depot_status', 'depot_id', 'status'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+    
     def to_dict(self):
         return {
             'id': self.vehicle_number,
             'vehicle_number': self.vehicle_number,
+            'depot_id': self.depot_id,
             'make': self.make,
             'model': self.model,
             'license_plate': self.license_plate,
             'holding_capacity': self.holding_capacity,
             'mileage': self.mileage,
             'status': self.status,
+            'version': self.version,
             'driver_phone': self.driver_phone,
             'maintenance_end_date': self.maintenance_end_date.isoformat() if self.maintenance_end_date else None,
             'created_at': self.created_at.isoformat(),
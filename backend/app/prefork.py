@@ -0,0 +1,94 @@
+"""Startup warm-up, and the fork hook for gunicorn's preload mode.
+
+``warm_up`` does the work the first requests of a fresh worker would
+otherwise pay for: configuring mappers, loading the token revocation list,
+the maintenance schedule and the search index, reading the MIME types table
+used for static assets, and compiling the hot ORM statements into the
+engine's statement cache, both unscoped (CLI, jobs) and scoped to a depot
+as requests run them. Statements run with keys that match nothing, and
+full-table lists fetch a single row, so warm-up stays cheap on a large
+database.
+
+With ``preload_app`` gunicorn runs this once in the master and the workers
+inherit the warmed state at fork. Connections must never be shared across
+processes, so the master closes its pool once warm and each worker calls
+``after_fork`` to start with a fresh pool (the compiled statement cache,
+which lives on the engine, is kept).
+"""
+import mimetypes
+import time
+from datetime import timedelta
+from flask import g
+from sqlalchemy.orm import configure_mappers
+from app import db
+from app.models import Driver, Job, Maintenance, Trip, TripArchive, User, Vehicle
+
+# Primary-key lookups behind the role checks and detail endpoints; no row has these keys
+_LOOKUPS = ((User, ''), (Vehicle, ''), (Driver, ''), (Trip, 0), (TripArchive, 0),
+            (Maintenance, 0), (Job, 0))
+
+
+def _queries():
+    """Read queries issued by the views, as they build them."""
+    return [
+        (User.query.filter_by(phone=''), False),
+        (Driver.query.filter_by(phone=''), False),
+        (Driver.query.filter_by(license_number=''), False),
+        (Vehicle.query.filter_by(vehicle_number=''), False),
+        (User.query.order_by(User.created_at), True),
+        (Vehicle.query.order_by(Vehicle.created_at), True),
+        (Driver.query.order_by(Driver.created_at), True),
+        (Trip.query.order_by(Trip.id), True),
+        (Trip.query.filter_by(status='').order_by(Trip.id), True),
+        (TripArchive.query.order_by(TripArchive.id), True),
+        (Maintenance.query.order_by(Maintenance.id), True),
+        (Maintenance.query.filter_by(vehicle_number=''), True),
+    ]
+
+
+def _compile_statements():
+    for model, key in _LOOKUPS:
+        db.session.get(model, key)
+    for query, full_list in _queries():
+        if full_list:
+            # Streamed, so only one row is fetched; the statement is cached as for .all()
+            next(iter(query.yield_per(1)), None)
+        else:
+            query.first()
+
+
+def warm_up(app):
+    """Build per-process caches and compile hot statements; returns seconds taken."""
+    from app.revocation import get_revocations
+    from app.scheduler import get_schedule
+    from app.search import TrieBackend, get_search_backend
+
+    started = time.perf_counter()
+    configure_mappers()
+    mimetypes.init()
+    with app.app_context():
+        try:
+            get_revocations().refresh()
+            get_schedule().due_within(timedelta(0))
+            backend = get_search_backend()
+            if isinstance(backend, TrieBackend):
+                backend.search('vehicle', [''], 1)
+            _compile_statements()
+            # Depot criteria are bound parameters, so one depot compiles them for all
+            with app.test_request_context():
+                g.depot_scope = ('', app.config['DEFAULT_DEPOT_ID'])
+                _compile_statements()
+        finally:
+            db.session.remove()
+            # The master must not hand open connections to its workers
+            for engine in db.engines.values():
+                engine.dispose()
+    return time.perf_counter() - started
+
+
+def after_fork(app):
+    """Give a forked worker its own connection pools (call first thing in the child)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the parent's connections, if any, to the parent
+            engine.dispose(close=False)
@@ -0,0 +1,171 @@
+"""Request rate and concurrency limits.
+
+Every /api request takes a token from a bucket keyed by blueprint and caller
+(JWT identity when a valid token is sent, client IP otherwise). Budgets are
+set per blueprint in RATE_LIMITS as 'N/period'; a bucket holds N tokens and
+refills at N per period, so short bursts are allowed but the sustained rate
+is capped. Buckets live in this process ('memory') or, with
+RATELIMIT_STORAGE set to a file path, in a SQLite file shared by all workers
+on the host.
+
+Expensive endpoints listed in CONCURRENCY_LIMITS also hold a semaphore slot
+for the duration of the request, per worker process.
+
+Either limit answers 429 with Retry-After.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Buckets untouched this long are full again for any budget we use
+_IDLE_SECONDS = 86400
+
+
+def parse_limit(value):
+    """'20/minute' -> (capacity 20, refill rate 1/3 per second)"""
+    count, period = value.split('/')
+    return int(count), int(count) / PERIODS[period.strip().rstrip('s')]
+
+
+class MemoryStore:
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Take one token; returns 0 or the seconds until one is available."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if len(self._buckets) > 10000:
+                for k in [k for k, (_, t) in self._buckets.items() if now - t > _IDLE_SECONDS]:
+                    del self._buckets[k]
+            return wait
+
+
+class SqliteStore:
+    """Buckets in a local SQLite file, so every worker on the host shares them."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # losing a bucket on power loss is harmless
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row or (capacity, now)
+            tokens = min(capacity, tokens + max(0, now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens - 1 if not wait else tokens, now))
+            self._takes += 1
+            if self._takes % 10000 == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - _IDLE_SECONDS,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    def __init__(self, app):
+        storage = app.config['RATELIMIT_STORAGE']
+        self.store = MemoryStore() if storage == 'memory' else SqliteStore(storage)
+        self.budgets = {name: parse_limit(value) for name, value in app.config['RATE_LIMITS'].items()}
+        self.semaphores = {endpoint: threading.BoundedSemaphore(slots)
+                           for endpoint, slots in app.config['CONCURRENCY_LIMITS'].items()}
+        self.trusted_proxies = app.config['RATELIMIT_TRUSTED_PROXIES']
+        self._warned_forwarded = False
+
+    def client_ip(self):
+        # Behind N proxies the client is the Nth address from the end of X-Forwarded-For
+        route = request.access_route
+        if self.trusted_proxies and len(route) >= self.trusted_proxies:
+            return route[-self.trusted_proxies]
+        if not self.trusted_proxies and not self._warned_forwarded and 'X-Forwarded-For' in request.headers:
+            # Every client would share the proxy's bucket
+            self._warned_forwarded = True
+            current_app.logger.error(
+                'X-Forwarded-For received but RATELIMIT_TRUSTED_PROXIES is 0; anonymous clients are '
+                'rate limited as %s. Set RATELIMIT_TRUSTED_PROXIES to the number of proxies.',
+                request.remote_addr)
+        return request.remote_addr
+
+    def caller(self):
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            try:
+                return 'user:' + decode_token(auth[7:])['sub']
+            except (JWTExtendedException, PyJWTError):
+                pass  # invalid or expired; the view will reject it
+        return 'ip:' + self.client_ip()
+
+    def check(self):
+        """Take a token for this request; returns seconds to wait or 0."""
+        name = request.blueprint if request.blueprint in self.budgets else 'default'
+        capacity, rate = self.budgets[name]
+        try:
+            return self.store.take(f'{name}:{self.caller()}', capacity, rate, time.time())
+        except sqlite3.Error:
+            current_app.logger.exception('Rate limit store unavailable; allowing request')
+            return 0
+
+
+def _too_many(retry_after, message):
+    response = jsonify({'message': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_app(app):
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    limiter = RateLimiter(app)
+    app.extensions['ratelimit'] = limiter
+
+    @app.before_request
+    def limit_request():
+        if not request.path.startswith('/api/') or request.method == 'OPTIONS':
+            return None
+        wait = limiter.check()
+        if wait:
+            return _too_many(wait, 'Too many requests, please slow down')
+
+        semaphore = limiter.semaphores.get(request.endpoint)
+        if semaphore is not None:
+            if not semaphore.acquire(timeout=app.config['CONCURRENCY_WAIT_SECONDS']):
+                return _too_many(1, 'Server busy, please retry')
+            g.concurrency_slot = semaphore
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        semaphore = g.pop('concurrency_slot', None)
+        if semaphore is not None:
+            semaphore.release()
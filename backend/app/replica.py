@@ -0,0 +1,83 @@
+"""Read replica routing.
+
+When REPLICA_DATABASE_URL is set it becomes the 'replica' bind, and views
+wrapped in ``read_replica`` run their queries against it. Everything else,
+and any flush or DML statement, stays on the primary.
+
+Replicas lag behind the primary, so a caller who just wrote is pinned to the
+primary for REPLICA_STICKY_SECONDS. This is tracked per identity in the
+worker that took the write, and with a short-lived cookie for the workers
+that did not.
+"""
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+
+STICKY_COOKIE = 'read_primary_until'
+
+_recent_writers = {}  # identity -> time until which reads stay on the primary
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and has_request_context() and g.get('use_replica')
+                and not getattr(clause, 'is_dml', False)):
+            engine = self._db.engines.get('replica')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no JWT verified for this request
+        return None
+
+
+def _recently_wrote():
+    now = time.time()
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    identity = _identity()
+    return identity is not None and _recent_writers.get(identity, 0) > now
+
+
+def read_replica(view):
+    """Serve a read-only view from the replica, unless the caller just wrote."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'replica' in current_app.config.get('SQLALCHEMY_BINDS', {}) and not _recently_wrote():
+            g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    @app.after_request
+    def track_writes(response):
+        if g.get('use_replica'):
+            response.headers['X-Database'] = 'replica'
+        elif 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+            response.headers['X-Database'] = 'primary'
+
+        if request.method in ['GET', 'HEAD', 'OPTIONS'] or response.status_code >= 400:
+            return response
+        window = app.config['REPLICA_STICKY_SECONDS']
+        until = time.time() + window
+        identity = _identity()
+        if identity is not None:
+            _recent_writers[identity] = until
+            # Forget writers whose window has passed
+            if len(_recent_writers) > 1000:
+                now = time.time()
+                for key in [k for k, v in _recent_writers.items() if v <= now]:
+                    del _recent_writers[key]
+        response.set_cookie(STICKY_COOKIE, str(until), max_age=window, httponly=True, samesite='Lax')
+        return response
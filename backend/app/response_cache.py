@@ -0,0 +1,313 @@
+"""Cached responses for hot read endpoints.
+
+Views wrapped in ``cached_response(*models)`` keep their serialized JSON
+keyed by endpoint, URL arguments, normalised query string and the caller's
+role and depot. Every key also carries a generation number for each table the view
+reads; committing a change to one of those tables (ORM flushes, bulk
+UPDATE/DELETE/INSERT statements and ``transition``) bumps its generation,
+so older entries are never served again and age out of the LRU.
+
+- storage: 'memory' keeps an LRU per worker bounded to
+  RESPONSE_CACHE_MAX_BYTES. A file path keeps entries and generations in a
+  SQLite file shared by every worker on the host, so a write in one worker
+  invalidates the others immediately; with 'memory' other workers may serve
+  the old response for up to RESPONSE_CACHE_TTL seconds.
+- a caller who just wrote (see ``replica``) bypasses the cache, so they
+  always read their own writes
+- responses read from the replica are served but never stored: the replica
+  may not have caught up with the generation in the key, and a stale entry
+  would outlive its lag for everyone sharing the key
+- responses carry ``X-Cache: HIT|MISS``; hit/miss counts per worker are
+  reported by ``GET /api/reports/cache``
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import Response, current_app, g, has_app_context, make_response, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.models import Driver, Maintenance, Trip, TripArchive, User, Vehicle
+from app.replica import _recently_wrote
+from app.depots import current_depot
+
+# Tables whose writes invalidate cached responses (users: get_drivers filters on roles)
+CACHED_MODELS = (Vehicle, Driver, Trip, TripArchive, Maintenance, User)
+CACHED_TABLES = {model.__tablename__ for model in CACHED_MODELS}
+
+HEADER = 'X-Cache'
+
+
+class MemoryBackend:
+    """LRU of responses in this worker, bounded by total body size."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (body, etag, expires)
+        self._size = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generations(self, tables):
+        return [self._generations.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, body, etag):
+        size = len(key) + len(body)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (body, etag, time.monotonic() + self.ttl)
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        body = self._entries.pop(key)[0]
+        self._size -= len(key) + len(body)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._size}
+
+
+class SqliteBackend:
+    """Responses and generations in a local SQLite file shared by all workers on the host."""
+
+    def __init__(self, path, max_bytes, ttl):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # a lost entry is just a miss
+            conn.execute('CREATE TABLE IF NOT EXISTS generations '
+                         '(name TEXT PRIMARY KEY, generation INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS responses '
+                         '(key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT NOT NULL, '
+                         'size INTEGER NOT NULL, expires REAL NOT NULL, used REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_responses_used ON responses (used)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def generations(self, tables):
+        rows = dict(self._connection().execute(
+            f'SELECT name, generation FROM generations WHERE name IN ({",".join("?" * len(tables))})',
+            tables))
+        return [rows.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        self._connection().executemany(
+            'INSERT INTO generations (name, generation) VALUES (?, 1) '
+            'ON CONFLICT (name) DO UPDATE SET generation = generation + 1',
+            [(table,) for table in tables])
+
+    def get(self, key):
+        conn, now = self._connection(), time.time()
+        row = conn.execute('SELECT body, etag FROM responses WHERE key = ? AND expires >= ?',
+                           (key, now)).fetchone()
+        if row is not None:
+            conn.execute('UPDATE responses SET used = ? WHERE key = ?', (now, key))
+        return row
+
+    def set(self, key, body, etag):
+        conn, now = self._connection(), time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT OR REPLACE INTO responses (key, body, etag, size, expires, used) '
+                         'VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, body, etag, len(key) + len(body), now + self.ttl, now))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                conn.execute('DELETE FROM responses WHERE expires < ?', (now,))
+                # Drop least recently used entries until back under the limit
+                conn.execute(
+                    'DELETE FROM responses WHERE key IN (SELECT key FROM ('
+                    '  SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS running FROM responses'
+                    ') WHERE running > ?)', (self.max_bytes,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+class ResponseCache:
+    def __init__(self, app):
+        storage = app.config['RESPONSE_CACHE_STORAGE']
+        max_bytes, ttl = app.config['RESPONSE_CACHE_MAX_BYTES'], app.config['RESPONSE_CACHE_TTL']
+        if storage == 'memory':
+            self.backend = MemoryBackend(max_bytes, ttl)
+        else:
+            self.backend = SqliteBackend(storage, max_bytes, ttl)
+        self.storage = 'memory' if storage == 'memory' else 'sqlite'
+        # Larger responses are not worth evicting everything else for
+        self.max_entry_bytes = max_bytes // 4
+        self.hits = self.misses = self.bypassed = 0
+
+    def invalidate(self, tables):
+        try:
+            self.backend.bump(sorted(tables))
+        except sqlite3.Error:
+            current_app.logger.exception('Response cache store unavailable; entries may be stale '
+                                         'for up to RESPONSE_CACHE_TTL seconds')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        try:
+            stored = self.backend.stats()
+        except sqlite3.Error:
+            stored = {}
+        return {
+            'storage': self.storage,
+            'pid': os.getpid(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            **stored,
+        }
+
+
+def get_response_cache():
+    return current_app.extensions.get('response_cache') if has_app_context() else None
+
+
+def _caller_role():
+    role = get_jwt().get('role')
+    if role is None:  # token issued before roles were added to the claims
+        user = User.query.get(get_jwt_identity())
+        role = user.role if user else ''
+    return role
+
+
+def _cache_key(tables, generations):
+    query = urlencode(sorted(request.args.items(multi=True)))
+    view_args = urlencode(sorted((request.view_args or {}).items()))
+    stamp = ','.join(f'{table}:{generation}' for table, generation in zip(tables, generations))
+    depot = current_depot()
+    return '|'.join([request.endpoint, _caller_role(), 'all' if depot is None else str(depot),
+                     view_args, query, stamp])
+
+
+def _bypass():
+    return (_recently_wrote()
+            or 'no-cache' in request.headers.get('Cache-Control', '')
+            or 'no-cache' in request.headers.get('Pragma', ''))
+
+
+def cached_response(*models):
+    """Cache a GET view's 200 responses until one of ``models`` changes (place under jwt_required)."""
+    tables = sorted(model.__tablename__ for model in models)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None or request.method != 'GET':
+                return view(*args, **kwargs)
+            if _bypass():
+                cache.bypassed += 1
+                return view(*args, **kwargs)
+
+            try:
+                # Generations are read before the view queries, so a response built
+                # from data that changes meanwhile is stored under an outdated key
+                key = _cache_key(tables, cache.backend.generations(tables))
+                cached = cache.backend.get(key)
+            except sqlite3.Error:
+                current_app.logger.exception('Response cache store unavailable; serving uncached')
+                return view(*args, **kwargs)
+            if cached is not None:
+                cache.hits += 1
+                response = Response(cached[0], mimetype='application/json')
+                response.set_etag(cached[1])
+                response.headers[HEADER] = 'HIT'
+                return response
+
+            cache.misses += 1
+            response = make_response(view(*args, **kwargs))
+            response.headers[HEADER] = 'MISS'
+            if (response.status_code == 200 and not response.direct_passthrough
+                    and not g.get('use_replica')):
+                body = response.get_data()
+                if len(body) <= cache.max_entry_bytes:
+                    response.add_etag()
+                    try:
+                        cache.backend.set(key, body, response.get_etag()[0])
+                    except sqlite3.Error:
+                        current_app.logger.exception('Could not store cached response')
+            return response
+        return wrapper
+    return decorator
+
+
+def _touched(session, table):
+    session.info.setdefault('cache_tables', set()).add(table)
+
+
+def _mark_row(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _touched(session, mapper.local_table.name)
+
+
+for _model in CACHED_MODELS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _mark_row)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_statement(orm_execute_state):
+    # Bulk and Core DML run through the session (transition, upserts, archive moves)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement.table, 'name', None)
+        if table in CACHED_TABLES:
+            _touched(orm_execute_state.session, table)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate(session):
+    tables = session.info.pop('cache_tables', None)
+    cache = get_response_cache()
+    if tables and cache is not None:
+        cache.invalidate(tables)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard(session, previous_transaction):
+    session.info.pop('cache_tables', None)
+
+
+def init_app(app):
+    if not app.config['RESPONSE_CACHE_ENABLED']:
+        return
+    app.extensions['response_cache'] = ResponseCache(app)
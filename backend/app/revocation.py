@@ -0,0 +1,174 @@
+"""JWT revocation.
+
+Revocations are stored in ``revoked_tokens`` either by jti (one token, e.g.
+on logout) or as a per-user cutoff that revokes every token of that user
+issued before it (role change, account deletion). ``iat`` only has whole
+seconds, so tokens also carry their exact issue time in ``iat_precise``;
+a token issued right after a cutoff, in the same second, stays valid. Each
+worker keeps revocations in memory, so checking a token costs no query:
+
+- revocations committed by this worker are applied as the transaction commits
+- those from other workers are picked up by an incremental read of new rows
+  at most every TOKEN_REVOCATION_REFRESH seconds
+
+Entries are dropped from memory (and can be pruned from the table with
+``flask fleet prune-revoked-tokens``) once every token they cover has expired.
+"""
+import calendar
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app, has_app_context, jsonify
+from sqlalchemy import delete, event, or_, select
+from sqlalchemy.orm import Session
+from app import db, jwt
+from app.models import RevokedToken
+
+# Re-read rows this recent on every refresh, in case a transaction holding a
+# lower id committed after a higher one was already seen
+_REREAD_WINDOW = timedelta(seconds=30)
+
+
+_COLUMNS = (RevokedToken.id, RevokedToken.jti, RevokedToken.phone,
+            RevokedToken.issued_before, RevokedToken.expires_at)
+
+
+ISSUED_AT_CLAIM = 'iat_precise'
+
+
+def _epoch(dt):
+    return calendar.timegm(dt.utctimetuple())
+
+
+def _timestamp(dt):
+    """Epoch seconds of a naive UTC datetime, keeping the microseconds."""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationCache:
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._jtis = {}     # jti -> expiry (epoch seconds)
+        self._cutoffs = {}  # phone -> (issued-at cutoff with microseconds, expiry)
+        self._last_id = 0
+        self._read_since = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        """Apply (id, jti, phone, issued_before, expires_at) rows."""
+        with self._lock:
+            self._add(rows)
+
+    def _add(self, rows):
+        for row_id, jti, phone, issued_before, expires_at in rows:
+            expires = _epoch(expires_at)
+            if jti:
+                self._jtis[jti] = expires
+            if issued_before is not None:
+                cutoff = _timestamp(issued_before)
+                current = self._cutoffs.get(phone)
+                if current is None or cutoff > current[0]:
+                    self._cutoffs[phone] = (cutoff, expires)
+            self._last_id = max(self._last_id, row_id)
+
+    def refresh(self):
+        """Load revocations committed since the last refresh."""
+        started = datetime.utcnow()
+        stmt = select(*_COLUMNS).where(RevokedToken.expires_at > started)
+        if self._read_since is not None:
+            stmt = stmt.where(or_(RevokedToken.id > self._last_id,
+                                  RevokedToken.created_at >= self._read_since))
+        rows = db.session.execute(stmt.order_by(RevokedToken.id)).all()
+        with self._lock:
+            self._add(rows)
+            self._prune(_epoch(started))
+            self._read_since = started - _REREAD_WINDOW
+            self._checked_at = time.monotonic()
+
+    def _prune(self, now):
+        for jti in [k for k, exp in self._jtis.items() if exp <= now]:
+            del self._jtis[jti]
+        for phone in [k for k, (_, exp) in self._cutoffs.items() if exp <= now]:
+            del self._cutoffs[phone]
+
+    def is_revoked(self, payload):
+        if self._checked_at is None or time.monotonic() - self._checked_at > self.refresh_interval:
+            self.refresh()
+        if payload.get('jti') in self._jtis:
+            return True
+        cutoff = self._cutoffs.get(payload.get('sub'))
+        if cutoff is None:
+            return False
+        # Tokens issued before iat_precise existed fall back to whole seconds,
+        # which only err towards revoking
+        return payload.get(ISSUED_AT_CLAIM, payload.get('iat', 0)) < cutoff[0]
+
+
+def get_revocations():
+    cache = current_app.extensions.get('token_revocations')
+    if cache is None:
+        cache = RevocationCache(current_app.config['TOKEN_REVOCATION_REFRESH'])
+        current_app.extensions['token_revocations'] = cache
+    return cache
+
+
+def revoke_token(payload):
+    """Revoke one decoded token (caller commits)."""
+    entry = RevokedToken(jti=payload['jti'], phone=payload.get('sub'),
+                         expires_at=datetime.utcfromtimestamp(payload['exp']))
+    db.session.add(entry)
+    return entry
+
+
+def revoke_user_tokens(phone):
+    """Revoke every token issued to ``phone`` so far (caller commits)."""
+    now = datetime.utcnow()
+    lifetime = max(current_app.config['JWT_ACCESS_TOKEN_EXPIRES'],
+                   current_app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+    entry = RevokedToken(phone=phone, issued_before=now, expires_at=now + lifetime)
+    db.session.add(entry)
+    return entry
+
+
+def prune_revoked_tokens():
+    """Delete entries whose tokens have all expired. Returns the number removed."""
+    removed = db.session.execute(
+        delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return removed
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_revocations(session, flush_context):
+    revoked = [tuple(getattr(obj, c.key) for c in _COLUMNS)
+               for obj in session.new if isinstance(obj, RevokedToken)]
+    if revoked:
+        session.info.setdefault('revoked_tokens', []).extend(revoked)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_revocations(session):
+    revoked = session.info.pop('revoked_tokens', None)
+    if revoked and has_app_context():
+        get_revocations().add(revoked)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_revocations(session, previous_transaction):
+    session.info.pop('revoked_tokens', None)
+
+
+def init_app(app):
+    @jwt.additional_claims_loader
+    def issued_at_claim(identity):
+        return {ISSUED_AT_CLAIM: time.time()}
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return get_revocations().is_revoked(jwt_payload)
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({'message': 'Token has been revoked'}), 401
@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import AuditEvent, User
+from app.audit import audit_log
+
+audit_bp = Blueprint('audit', __name__)
+
+MASTER_PHONE = '+9868995742'
+
+@audit_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_audit_events():
+    """Audit events, newest first (?entity=&entity_id=&actor=&action=&before_id=&limit=)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Only admin, manager, or master can read the audit log
+    if not user or (user.role not in ['admin', 'manager'] and user.phone != MASTER_PHONE):
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    # Make this worker's buffered events visible first; if that fails, serve what is persisted
+    audit_log.flush()
+    
+    query = AuditEvent.query
+    for field in ['entity', 'entity_id', 'actor', 'action']:
+        if request.args.get(field):
+            query = query.filter(getattr(AuditEvent, field) == request.args[field])
+    
+    # Keyset pagination: pass the last id of a page as before_id for the next one
+    before_id = request.args.get('before_id', type=int)
+    if before_id:
+        query = query.filter(AuditEvent.id < before_id)
+    
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    events = query.order_by(AuditEvent.id.desc()).limit(limit).all()
+    
+    return jsonify({
+        'events': [event.to_dict() for event in events],
+        'next_before_id': events[-1].id if len(events) == limit else None
+    }), 200
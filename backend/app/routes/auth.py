@@ -1,12 +1,29 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from app import db
 from app.models import User, Driver
-from email_validator import validate_email, EmailNotValidError
+from app.revocation import revoke_token
+from app.depots import token_claims
+from app.email_check import check_email
+from email_validator import EmailNotValidError
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
+def registration_conflict(phone, email, license_number):
+    """Message for the first of phone, email or license already taken, else None"""
+    taken = db.session.execute(select(
+        exists().where(User.phone == phone) | exists().where(Driver.phone == phone),
+        exists().where(User.email == email) | exists().where(Driver.email == email),
+        exists().where(Driver.license_number == license_number),
+    )).one()
+    messages = ['Phone number already exists', 'Email already exists', 'License number already registered']
+    return next((message for message, hit in zip(messages, taken) if hit), None)
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -18,22 +35,16 @@ def register():
     if not data.get('license_number'):
         return jsonify({'message': 'License number is required'}), 400
     
-    # Validate email
+    # Validate email (syntax only unless EMAIL_CHECK_DELIVERABILITY is set)
     try:
-        validate_email(data['email'])
+        check_email(data['email'])
     except EmailNotValidError:
         return jsonify({'message': 'Invalid email address'}), 400
     
-    # Check user already exists
-    if User.query.filter_by(phone=data['phone']).first():
-        return jsonify({'message': 'Phone number already exists'}), 400
-    
-    if User.query.filter_by(email=data['email']).first():
-        return jsonify({'message': 'Email already exists'}), 400
-
-    # Check if license number already exists
-    if Driver.query.filter_by(license_number=data['license_number']).first():
-        return jsonify({'message': 'License number already registered'}), 400
+    # Check phone, email and license are free, in one query
+    conflict = registration_conflict(data['phone'], data['email'], data['license_number'])
+    if conflict:
+        return jsonify({'message': conflict}), 400
     
     # Determine role: driver if license provided, else user
     role = 'driver'
@@ -67,7 +78,13 @@ def register():
         status='available'
     )
     db.session.add(driver)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same phone/email/license
+        db.session.rollback()
+        conflict = registration_conflict(data['phone'], data['email'], data['license_number'])
+        return jsonify({'message': conflict or 'Account already exists'}), 400
     
     return jsonify({
         'message': 'Registration successful',
@@ -87,8 +104,8 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'message': 'Invalid phone or password'}), 401
     
-    # Create tokens
-    access_token = create_access_token(identity=user.phone)
+    # Create tokens (role and depot changes revoke them, so the claims stay current)
+    access_token = create_access_token(identity=user.phone, additional_claims=token_claims(user))
     refresh_token = create_refresh_token(identity=user.phone)
     
     return jsonify({
@@ -102,9 +119,35 @@ def login():
 @jwt_required(refresh=True)
 def refresh():
     current_user_phone = get_jwt_identity()
-    access_token = create_access_token(identity=current_user_phone)
+    user = User.query.get(current_user_phone)
+    
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    access_token = create_access_token(identity=current_user_phone, additional_claims=token_claims(user))
     return jsonify({'access_token': access_token}), 200
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the presented token, and the refresh token if one is sent"""
+    tokens = [get_jwt()]
+    
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        try:
+            refresh_token = decode_token(data['refresh_token'])
+        except (JWTExtendedException, PyJWTError):
+            refresh_token = None  # expired, revoked or not ours: nothing to revoke
+        if refresh_token and refresh_token['sub'] == tokens[0]['sub'] and refresh_token['jti'] != tokens[0]['jti']:
+            tokens.append(refresh_token)
+    
+    for token in tokens:
+        revoke_token(token)
+    db.session.commit()
+    
+    return jsonify({'message': 'Logged out'}), 200
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Depot, User
+from app.models.user import MASTER_PHONE
+from app.depots import current_depot
+
+depots_bp = Blueprint('depots', __name__)
+
+@depots_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_depots():
+    """All depots, and the one this request is scoped to (null when all)"""
+    depots = Depot.query.order_by(Depot.id).all()
+    return jsonify({
+        'depots': [depot.to_dict() for depot in depots],
+        'current_depot': current_depot()
+    }), 200
+
+@depots_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_depot():
+    """Create a depot (admin/master only)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role != 'admin' and user.phone != MASTER_PHONE:
+        return jsonify({'message': 'Only admins can create depots'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'message': 'Missing depot name'}), 400
+    
+    if Depot.query.filter_by(name=name).first():
+        return jsonify({'message': 'Depot name already exists'}), 400
+    
+    depot = Depot(name=name)
+    db.session.add(depot)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Only a depot of the same name created meanwhile is the caller's problem
+        if Depot.query.filter_by(name=name).first():
+            return jsonify({'message': 'Depot name already exists'}), 400
+        raise
+    
+    return jsonify({
+        'message': 'Depot created successfully',
+        'depot': depot.to_dict()
+    }), 201
@@ -1,15 +1,23 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from datetime import datetime, date
 from app import db
 from app.models import Driver, User
+from app.compliance import SUSPENDED, compliance_report, license_valid, sweep_licenses
+from app.scheduler import parse_window
+from app.depots import unscoped
+from app.replica import read_replica
+from app.idempotency import idempotent
+from app.response_cache import cached_response
 
 drivers_bp = Blueprint('drivers', __name__)
 
 @drivers_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Driver, User)
 def get_drivers():
-    drivers = Driver.query.all()
+    drivers = Driver.query.order_by(Driver.created_at).all()
     # Filter out drivers who are users with non-driver roles (e.g., managers)
     actual_drivers = []
     for driver in drivers:
@@ -21,6 +29,8 @@ def get_drivers():
 
 @drivers_bp.route('/<string:phone>', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Driver)
 def get_driver(phone):
     driver = Driver.query.get(phone)
     
@@ -31,6 +41,7 @@ def get_driver(phone):
 
 @drivers_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_driver():
     current_user_phone = get_jwt_identity()
     user = User.query.get(current_user_phone)
@@ -45,12 +56,14 @@ def create_driver():
     if not data or not data.get('name') or not data.get('phone') or not data.get('license_number'):
         return jsonify({'message': 'Missing required fields'}), 400
     
-    # Check if phone number already exists
-    if Driver.query.filter_by(phone=data['phone']).first():
+    # Check if phone number and license number are free (in any depot)
+    with unscoped():
+        phone_taken = Driver.query.filter_by(phone=data['phone']).first()
+        license_taken = Driver.query.filter_by(license_number=data['license_number']).first()
+    if phone_taken:
         return jsonify({'message': 'Phone number already exists'}), 400
     
-    # Check if license number already exists
-    if Driver.query.filter_by(license_number=data['license_number']).first():
+    if license_taken:
         return jsonify({'message': 'License number already exists'}), 400
     
     # Parse license expiry date if provided
@@ -111,6 +124,10 @@ def update_driver(phone):
     if 'status' in data:
         driver.status = data['status']
     
+    # A renewed license lifts a compliance suspension
+    if driver.status == SUSPENDED and 'license_expiry' in data and license_valid(driver.license_expiry):
+        driver.status = 'available'
+    
     db.session.commit()
     
     return jsonify({
@@ -137,3 +154,48 @@ def delete_driver(phone):
     db.session.commit()
     
     return jsonify({'message': 'Driver deleted successfully'}), 200
+
+@drivers_bp.route('/compliance', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_license_compliance():
+    """Drivers whose license has expired or expires within a window (e.g. ?within=30d)"""
+    try:
+        window = parse_window(request.args.get('within'), default_days=30)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    today = date.today()
+    expired, expiring = compliance_report(window, today)
+    
+    def entry(driver):
+        return {**driver.to_dict(), 'days_left': (driver.license_expiry - today).days}
+    
+    return jsonify({
+        'as_of': today.isoformat(),
+        'expired': [entry(driver) for driver in expired],
+        'expiring': [entry(driver) for driver in expiring],
+        'expired_count': len(expired),
+        'expiring_count': len(expiring)
+    }), 200
+
+@drivers_bp.route('/compliance', methods=['POST'])
+@jwt_required()
+def sweep_license_compliance():
+    """Suspend drivers whose license has lapsed and reinstate renewed ones"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role not in ['admin', 'manager']:
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    suspended, reinstated = sweep_licenses()
+    if suspended or reinstated:
+        db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(suspended)} drivers suspended, {len(reinstated)} reinstated',
+        'suspended': sorted(suspended),
+        'reinstated': sorted(reinstated)
+    }), 200
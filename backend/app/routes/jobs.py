@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import Job, User
+from app.models.user import MASTER_PHONE
+from app.jobs import TASKS, enqueue
+from app.idempotency import idempotent
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def _can_manage(user):
+    return user is not None and (user.role in ['admin', 'manager'] or user.phone == MASTER_PHONE)
+
+@jobs_bp.route('/', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_job():
+    """Queue a background job: {"name": "archive-trips", "args": {"days": 30}}"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Jobs run across every depot, so only admin or master can queue them
+    if not user or (user.role != 'admin' and user.phone != MASTER_PHONE):
+        return jsonify({'message': 'Only admins can queue jobs'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    name = data.get('name')
+    if name not in TASKS:
+        return jsonify({'message': f"Unknown job. Must be one of: {', '.join(sorted(TASKS))}"}), 400
+    
+    args = data.get('args') or {}
+    if not isinstance(args, dict):
+        return jsonify({'message': 'args must be an object'}), 400
+    
+    try:
+        job = enqueue(name, args, created_by=current_user_phone)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({
+        'message': 'Job queued',
+        'job': job.to_dict()
+    }), 202
+
+@jobs_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_jobs():
+    """Recent jobs, newest first (?status=&limit=)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    if not _can_manage(user):
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    query = Job.query
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs]}), 200
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status and progress of a job (its creator, admin or manager)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'message': 'Job not found'}), 404
+    
+    if job.created_by != current_user_phone and not _can_manage(user):
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    return jsonify({'job': job.to_dict()}), 200
@@ -1,20 +1,33 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+from sqlalchemy import insert, select
 from app import db
 from app.models import Maintenance, Vehicle, User
+from app.transitions import transition, transition_ids
+from app.mileage import enqueue_mileage_service
+from app.scheduler import get_schedule, parse_window
+from app.audit import stage
+from app.depots import current_depot, in_scope
+from app.replica import read_replica
+from app.idempotency import idempotent
+from app.response_cache import cached_response
 
 maintenance_bp = Blueprint('maintenance', __name__)
 
 @maintenance_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Maintenance)
 def get_maintenance():
     """Get all maintenance records"""
-    maintenance_records = Maintenance.query.all()
+    maintenance_records = Maintenance.query.order_by(Maintenance.id).all()
     return jsonify({'maintenance': [record.to_dict() for record in maintenance_records]}), 200
 
 @maintenance_bp.route('/vehicle/<string:vehicle_number>', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Maintenance)
 def get_vehicle_maintenance(vehicle_number):
     """Get maintenance records for a specific vehicle"""
     maintenance_records = Maintenance.query.filter_by(vehicle_number=vehicle_number).all()
@@ -22,6 +35,7 @@ def get_vehicle_maintenance(vehicle_number):
 
 @maintenance_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_maintenance():
     """Create a new maintenance record"""
     current_user_phone = get_jwt_identity()
@@ -55,23 +69,31 @@ def create_maintenance():
     
     # Create new maintenance record
     maintenance = Maintenance(
+        depot_id=vehicle.depot_id,
         vehicle_number=data['vehicle_number'],
         type=data['type'],
         description=data.get('description', ''),
         date=maint_date,
         duration_days=duration_days,
         cost=float(data.get('cost', 0)),
+        mileage=vehicle.mileage,
         status='in_progress',
         start_date=start_datetime,
         end_date=end_datetime
     )
     
-    # Update vehicle status to maintenance and set end date
-    vehicle.status = 'maintenance'
-    vehicle.maintenance_end_date = end_datetime
+    # Put the vehicle into maintenance, unless it changed since we read it
+    if not transition(Vehicle,
+                      Vehicle.vehicle_number == vehicle.vehicle_number,
+                      Vehicle.version == vehicle.version,
+                      status='maintenance',
+                      maintenance_end_date=end_datetime):
+        db.session.rollback()
+        return jsonify({'message': 'Vehicle was modified by another request, please retry'}), 409
     
     db.session.add(maintenance)
     db.session.commit()
+    get_schedule().refresh(maintenance.vehicle_number)
     
     return jsonify({
         'message': 'Maintenance record created successfully',
@@ -81,6 +103,7 @@ def create_maintenance():
 
 @maintenance_bp.route('/<int:maint_id>/complete', methods=['PUT'])
 @jwt_required()
+@idempotent
 def complete_maintenance(maint_id):
     """Complete maintenance and restore vehicle to active"""
     current_user_phone = get_jwt_identity()
@@ -95,17 +118,25 @@ def complete_maintenance(maint_id):
     if not maintenance:
         return jsonify({'message': 'Maintenance record not found'}), 404
     
-    # Update maintenance status
-    maintenance.status = 'completed'
-    maintenance.end_date = datetime.utcnow()
+    # Update maintenance status (only once, even if completed concurrently)
+    if not transition(Maintenance,
+                      Maintenance.id == maint_id,
+                      Maintenance.status != 'completed',
+                      status='completed',
+                      end_date=datetime.utcnow()):
+        db.session.rollback()
+        return jsonify({'message': 'Maintenance is already completed'}), 409
     
-    # Restore vehicle to active
-    vehicle = Vehicle.query.get(maintenance.vehicle_number)
-    if vehicle:
-        vehicle.status = 'active'
-        vehicle.maintenance_end_date = None
+    # Restore vehicle to active if it is still in maintenance
+    transition(Vehicle,
+               Vehicle.vehicle_number == maintenance.vehicle_number,
+               Vehicle.status == 'maintenance',
+               status='active',
+               maintenance_end_date=None)
     
     db.session.commit()
+    get_schedule().refresh(maintenance.vehicle_number)
+    vehicle = Vehicle.query.get(maintenance.vehicle_number)
     
     return jsonify({
         'message': 'Maintenance completed successfully',
@@ -113,23 +144,69 @@ def complete_maintenance(maint_id):
         'vehicle': vehicle.to_dict() if vehicle else None
     }), 200
 
+@maintenance_bp.route('/complete', methods=['POST'])
+@jwt_required()
+@idempotent
+def complete_maintenance_bulk():
+    """Complete several maintenance records and restore their vehicles: {"ids": [...]} (max 500)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role == 'driver':
+        return jsonify({'message': 'Drivers cannot complete maintenance'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or len(ids) > 500 \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'message': 'ids must be a list of 1-500 maintenance ids'}), 400
+    ids = list(dict.fromkeys(ids))
+    
+    # One conditional UPDATE for the records, one for their vehicles
+    completed = set(transition_ids(Maintenance,
+                                   Maintenance.id.in_(ids),
+                                   Maintenance.status != 'completed',
+                                   status='completed',
+                                   end_date=datetime.utcnow()))
+    
+    vehicle_numbers = set(db.session.execute(
+        select(Maintenance.vehicle_number).where(Maintenance.id.in_(completed))).scalars()) if completed else set()
+    restored = transition_ids(Vehicle,
+                              Vehicle.vehicle_number.in_(vehicle_numbers),
+                              Vehicle.status == 'maintenance',
+                              status='active',
+                              maintenance_end_date=None) if vehicle_numbers else []
+    
+    existing = set(db.session.execute(
+        select(Maintenance.id).where(Maintenance.id.in_(set(ids) - completed))).scalars()) if len(completed) < len(ids) else set()
+    
+    db.session.commit()
+    get_schedule().refresh(*vehicle_numbers)
+    
+    results = [{
+        'id': maint_id,
+        'status': 'completed' if maint_id in completed else 'already_completed' if maint_id in existing else 'not_found'
+    } for maint_id in ids]
+    
+    return jsonify({
+        'message': f'{len(completed)} of {len(ids)} maintenance records completed',
+        'results': results,
+        'restored_vehicles': sorted(restored)
+    }), 200
+
 @maintenance_bp.route('/check-expired', methods=['POST'])
 @jwt_required()
 def check_expired_maintenance():
     """Check for expired maintenance and restore vehicles to active state"""
     now = datetime.utcnow()
     
-    # Find all vehicles with maintenance that has expired
-    vehicles_to_restore = Vehicle.query.filter(
-        Vehicle.status == 'maintenance',
-        Vehicle.maintenance_end_date <= now
-    ).all()
-    
-    restored_count = 0
-    for vehicle in vehicles_to_restore:
-        vehicle.status = 'active'
-        vehicle.maintenance_end_date = None
-        restored_count += 1
+    # Restore all vehicles whose maintenance has expired in one statement
+    restored_count = transition(Vehicle,
+                                Vehicle.status == 'maintenance',
+                                Vehicle.maintenance_end_date <= now,
+                                status='active',
+                                maintenance_end_date=None)
     
     if restored_count > 0:
         db.session.commit()
@@ -138,3 +215,105 @@ def check_expired_maintenance():
         'message': f'{restored_count} vehicles restored to active state',
         'restored_count': restored_count
     }), 200
+
+@maintenance_bp.route('/check-mileage', methods=['POST'])
+@jwt_required()
+def check_mileage_service():
+    """Schedule pending maintenance for vehicles past their service mileage"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role == 'driver':
+        return jsonify({'message': 'Drivers cannot schedule maintenance'}), 403
+    
+    scheduled_count = enqueue_mileage_service(current_app.config['SERVICE_INTERVALS_KM'], current_depot())
+    if scheduled_count > 0:
+        get_schedule().invalidate()
+    
+    return jsonify({
+        'message': f'{scheduled_count} maintenance records scheduled',
+        'scheduled_count': scheduled_count
+    }), 200
+
+@maintenance_bp.route('/due', methods=['GET'])
+@jwt_required()
+def get_due_maintenance():
+    """List vehicles due for maintenance within a window (e.g. ?within=7d)"""
+    try:
+        window = parse_window(request.args.get('within'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    due = get_schedule().due_within(window)
+    visible = in_scope(Vehicle.vehicle_number, (item['vehicle_number'] for item in due))
+    due = [item for item in due if item['vehicle_number'] in visible]
+    return jsonify({'due': due, 'count': len(due)}), 200
+
+@maintenance_bp.route('/due', methods=['POST'])
+@jwt_required()
+@idempotent
+def schedule_due_maintenance():
+    """Create pending maintenance records for everything due within a window"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role == 'driver':
+        return jsonify({'message': 'Drivers cannot schedule maintenance'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        window = parse_window(data.get('within') or request.args.get('within'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    schedule = get_schedule()
+    due = schedule.due_within(window)
+    visible = in_scope(Vehicle.vehicle_number, (item['vehicle_number'] for item in due))
+    due = [item for item in due if item['vehicle_number'] in visible]
+    if not due:
+        return jsonify({'message': '0 maintenance records scheduled', 'scheduled_count': 0}), 200
+    
+    # Snapshot current mileage and depot for the scheduled vehicles
+    vehicle_numbers = {item['vehicle_number'] for item in due}
+    vehicles = {vn: (mileage, depot_id) for vn, mileage, depot_id in
+                db.session.query(Vehicle.vehicle_number, Vehicle.mileage, Vehicle.depot_id)
+                .filter(Vehicle.vehicle_number.in_(vehicle_numbers))}
+    
+    now = datetime.utcnow()
+    returning = db.engine.dialect.insert_executemany_returning
+    stmt = insert(Maintenance)
+    if returning:
+        stmt = stmt.returning(Maintenance.id, sort_by_parameter_order=True)
+    result = db.session.execute(stmt, [{
+        'depot_id': vehicles[item['vehicle_number']][1],
+        'vehicle_number': item['vehicle_number'],
+        'type': item['type'],
+        'description': f"Scheduled: {item['reason']}",
+        'date': max(date.fromisoformat(item['due_date']), now.date()),
+        'duration_days': 1,
+        'cost': 0,
+        'status': 'pending',
+        'mileage': vehicles[item['vehicle_number']][0],
+        'version': 1,
+        'start_date': now,
+        'created_at': now,
+        'updated_at': now,
+    } for item in due])
+    # One event per record, keyed by its new id where the database returns it
+    ids = result.scalars().all() if returning else [None] * len(due)
+    for item, maint_id in zip(due, ids):
+        stage(db.session(), 'create', Maintenance.__tablename__, maint_id, {
+            'vehicle_number': [None, item['vehicle_number']],
+            'type': [None, item['type']],
+            'status': [None, 'pending']
+        }, vehicles[item['vehicle_number']][1])
+    db.session.commit()
+    schedule.refresh(*vehicle_numbers)
+    
+    return jsonify({
+        'message': f'{len(due)} maintenance records scheduled',
+        'scheduled_count': len(due),
+        'scheduled': due
+    }), 201
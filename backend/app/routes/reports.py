@@ -0,0 +1,51 @@
+import re
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import User
+from app.lanes import top_lanes
+from app.replica import read_replica
+from app.response_cache import get_response_cache
+
+reports_bp = Blueprint('reports', __name__)
+
+MASTER_PHONE = '+9868995742'
+
+PERIOD_RE = re.compile(r'^\d{4}-\d{2}$')
+
+@reports_bp.route('/lanes', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_lanes():
+    """Top origin -> destination lanes (?period=YYYY-MM or from/to, limit, sort)"""
+    period = request.args.get('period')
+    start = request.args.get('from')
+    end = request.args.get('to')
+    for value in (period, start, end):
+        if value and not PERIOD_RE.match(value):
+            return jsonify({'message': 'Invalid period format. Use YYYY-MM'}), 400
+    
+    sort = request.args.get('sort', 'count')
+    if sort not in ['count', 'distance', 'avg_distance']:
+        return jsonify({'message': 'Invalid sort. Must be: count, distance or avg_distance'}), 400
+    
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    
+    lanes = top_lanes(period=period, start=start, end=end, limit=limit, sort=sort)
+    return jsonify({'lanes': lanes}), 200
+
+@reports_bp.route('/cache', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Response cache hit/miss counts of the worker serving this request"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Only admin, manager, or master can read cache statistics
+    if not user or (user.role not in ['admin', 'manager'] and user.phone != MASTER_PHONE):
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify({'cache': {'enabled': False}}), 200
+    
+    return jsonify({'cache': {'enabled': True, **cache.stats()}}), 200
@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.search import SEARCH_FIELDS, search
+from app.replica import read_replica
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('', methods=['GET'])
+@search_bp.route('/', methods=['GET'])
+@jwt_required()
+@read_replica
+def search_all():
+    """Search vehicles, drivers and trips (?q=&type=vehicle,trip&page=&per_page=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Missing search query'}), 400
+    
+    entities = None
+    if request.args.get('type'):
+        entities = [t.strip() for t in request.args['type'].split(',') if t.strip()]
+        if any(t not in SEARCH_FIELDS for t in entities):
+            return jsonify({'message': 'Invalid type. Must be: vehicle, driver or trip'}), 400
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    results, backend = search(query, entities, page, per_page)
+    
+    return jsonify({
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'backend': backend
+    }), 200
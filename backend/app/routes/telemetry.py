@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+from app import db
+from app.models import Trip, User, Vehicle
+from app.depots import current_depot, in_scope
+from app.telemetry import BINARY, NDJSON, TelemetryError, ingest, last_positions, parse_binary, parse_ndjson
+
+telemetry_bp = Blueprint('telemetry', __name__)
+
+@telemetry_bp.route('/', methods=['POST'])
+@jwt_required()
+def post_telemetry():
+    """Append a batch of GPS pings (NDJSON or binary, see app/telemetry.py)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    # Refuse oversized uploads before buffering them (chunked bodies are read up to the cap)
+    max_bytes = current_app.config['TELEMETRY_MAX_BATCH'] * current_app.config['TELEMETRY_MAX_PING_BYTES']
+    too_large = jsonify({'message': f'Request body larger than {max_bytes} bytes'}), 413
+    if request.content_length is not None and request.content_length > max_bytes:
+        return too_large
+    body = request.stream.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        return too_large
+    
+    content_type = request.mimetype
+    
+    try:
+        if content_type == BINARY:
+            pings, errors = parse_binary(body)
+        elif content_type in [NDJSON, 'application/json', 'text/plain']:
+            pings, errors = parse_ndjson(body.decode('utf-8', errors='replace'))
+        else:
+            return jsonify({'message': f'Unsupported content type. Use {NDJSON} or {BINARY}'}), 415
+    except TelemetryError as exc:
+        return jsonify({'message': str(exc)}), 400
+    
+    if len(pings) > current_app.config['TELEMETRY_MAX_BATCH']:
+        return jsonify({'message': f"At most {current_app.config['TELEMETRY_MAX_BATCH']} pings per request"}), 413
+    
+    # Drivers may only report the vehicle of their active trip
+    if user.role == 'driver':
+        own = set(db.session.execute(
+            select(Trip.vehicle_number).where(Trip.driver_phone == user.phone, Trip.status == 'active')
+        ).scalars())
+        others = sorted({ping['vehicle_number'] for ping in pings} - own)
+        if others:
+            return jsonify({'message': 'Drivers can only report the vehicle of their active trip',
+                            'vehicles': others}), 403
+    
+    unknown = ingest(pings) if pings else set()
+    rejected_unknown = sum(1 for ping in pings if ping['vehicle_number'] in unknown)
+    
+    return jsonify({
+        'accepted': len(pings) - rejected_unknown,
+        'rejected': len(errors) + rejected_unknown,
+        'errors': [{'at': at, 'message': message} for at, message in errors[:20]],
+        'unknown_vehicles': sorted(unknown)
+    }), 201
+
+@telemetry_bp.route('/positions', methods=['GET'])
+@jwt_required()
+def get_positions():
+    """Last known position of every vehicle (or ?vehicle=V1,V2)"""
+    vehicles = request.args.get('vehicle')
+    vehicle_numbers = [v for v in vehicles.split(',') if v] if vehicles else None
+    
+    # Only the depot's vehicles (all vehicles when unscoped)
+    if vehicle_numbers is not None:
+        vehicle_numbers = sorted(in_scope(Vehicle.vehicle_number, vehicle_numbers))
+    elif current_depot() is not None:
+        vehicle_numbers = db.session.execute(select(Vehicle.vehicle_number)).scalars().all()
+    
+    positions = last_positions(vehicle_numbers)
+    return jsonify({'positions': [
+        {**ping, 'ts': ping['ts'].isoformat()} for ping in sorted(positions.values(), key=lambda p: p['vehicle_number'])
+    ]}), 200
+
+@telemetry_bp.route('/<string:vehicle_number>/position', methods=['GET'])
+@jwt_required()
+def get_position(vehicle_number):
+    """Last known position of a vehicle"""
+    if not in_scope(Vehicle.vehicle_number, [vehicle_number]):
+        return jsonify({'message': 'No position for this vehicle'}), 404
+    
+    ping = last_positions([vehicle_number]).get(vehicle_number)
+    
+    if not ping:
+        return jsonify({'message': 'No position for this vehicle'}), 404
+    
+    return jsonify({'position': {**ping, 'ts': ping['ts'].isoformat()}}), 200
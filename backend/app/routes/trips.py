@@ -1,26 +1,44 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy import select
 from app import db
-from app.models import Trip, User
+from app.models import Trip, TripArchive, User, Vehicle
+from app.transitions import transition, transition_ids
+from app.mileage import accrue_trip_distance, accrue_trips_distance
+from app.lanes import intern_location, record_lane, record_lanes
+from app.telemetry import fill_trip_distances
+from app.compliance import get_eligible_drivers
+from app.scheduler import get_schedule
+from app.replica import read_replica
+from app.idempotency import idempotent
+from app.response_cache import cached_response
 
 trips_bp = Blueprint('trips', __name__)
 
 @trips_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Trip, TripArchive)
 def get_trips():
-    """Get trips (optionally filter by status)"""
+    """Get trips (optionally filter by status; ?include_archived=true adds cold history)"""
     status = request.args.get('status', None)  # active, completed, or None for all
+    include_archived = request.args.get('include_archived', 'false').lower() in ['1', 'true', 'yes']
     
     if status:
-        trips = Trip.query.filter_by(status=status).all()
+        trips = Trip.query.filter_by(status=status).order_by(Trip.id).all()
     else:
-        trips = Trip.query.all()
+        trips = Trip.query.order_by(Trip.id).all()
+    
+    # Only completed trips are ever archived
+    if include_archived and status in [None, 'completed']:
+        trips += TripArchive.query.order_by(TripArchive.id).all()
     
     return jsonify({'trips': [trip.to_dict() for trip in trips]}), 200
 
 @trips_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_trip():
     """Create a new trip"""
     current_user_phone = get_jwt_identity()
@@ -42,12 +60,24 @@ def create_trip():
     except ValueError:
         return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
+    # Check if vehicle exists (in the caller's depot; the trip belongs to the vehicle's)
+    vehicle = Vehicle.query.get(data['vehicle_number'])
+    if not vehicle:
+        return jsonify({'message': 'Vehicle not found'}), 404
+    
+    # Check the driver may drive: active status, a valid license and the vehicle's depot
+    if not get_eligible_drivers().is_eligible(data['driver_phone'], vehicle.depot_id):
+        return jsonify({'message': 'Driver is not eligible for trips (unknown, inactive, suspended, license expired or another depot)'}), 400
+    
     # Create new trip
     trip = Trip(
+        depot_id=vehicle.depot_id,
         vehicle_number=data['vehicle_number'],
         driver_phone=data['driver_phone'],
         origin=data['origin'],
         destination=data['destination'],
+        origin_id=intern_location(data['origin']),
+        destination_id=intern_location(data['destination']),
         date=trip_date,
         distance=float(data.get('distance', 0)),
         fuel_type=data.get('fuel_type', 'petrol'),
@@ -64,10 +94,15 @@ def create_trip():
 
 @trips_bp.route('/<int:trip_id>', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Trip, TripArchive)
 def get_trip(trip_id):
     """Get a specific trip"""
     trip = Trip.query.get(trip_id)
     
+    if not trip and request.args.get('include_archived', 'false').lower() in ['1', 'true', 'yes']:
+        trip = TripArchive.query.get(trip_id)
+    
     if not trip:
         return jsonify({'message': 'Trip not found'}), 404
     
@@ -75,6 +110,7 @@ def get_trip(trip_id):
 
 @trips_bp.route('/<int:trip_id>/complete', methods=['PUT'])
 @jwt_required()
+@idempotent
 def complete_trip(trip_id):
     """Mark a trip as completed"""
     current_user_phone = get_jwt_identity()
@@ -89,16 +125,77 @@ def complete_trip(trip_id):
     if not trip:
         return jsonify({'message': 'Trip not found'}), 404
     
-    # Update trip status
-    trip.status = 'completed'
-    trip.completed_at = datetime.utcnow()
+    # Update trip status (only an active trip can be completed)
+    if not transition(Trip,
+                      Trip.id == trip_id,
+                      Trip.status == 'active',
+                      status='completed',
+                      completed_at=datetime.utcnow()):
+        db.session.rollback()
+        return jsonify({'message': 'Trip is not active'}), 409
+    
+    # Take the distance from the GPS track if none was entered, then accrue
+    # it into vehicle mileage and driver odometer
+    fill_trip_distances([trip])
+    accrue_trip_distance(trip)
+    record_lane(trip)
+    
     db.session.commit()
+    get_schedule().refresh(trip.vehicle_number)
     
     return jsonify({
         'message': 'Trip completed successfully',
         'trip': trip.to_dict()
     }), 200
 
+@trips_bp.route('/complete', methods=['POST'])
+@jwt_required()
+@idempotent
+def complete_trips():
+    """Mark several trips as completed: {"ids": [1, 2, ...]} (max 500)"""
+    current_user_phone = get_jwt_identity()
+    user = User.query.get(current_user_phone)
+    
+    # Check if user has permission
+    if user.role == 'driver':
+        return jsonify({'message': 'Drivers cannot complete trips'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or len(ids) > 500 \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'message': 'ids must be a list of 1-500 trip ids'}), 400
+    ids = list(dict.fromkeys(ids))
+    
+    # One conditional UPDATE for all of them; only active trips change
+    completed = set(transition_ids(Trip,
+                                   Trip.id.in_(ids),
+                                   Trip.status == 'active',
+                                   status='completed',
+                                   completed_at=datetime.utcnow()))
+    
+    trips = Trip.query.filter(Trip.id.in_(completed)).all() if completed else []
+    fill_trip_distances(trips)
+    accrue_trips_distance(trips)
+    record_lanes(trips)
+    
+    existing = set(db.session.execute(
+        select(Trip.id).where(Trip.id.in_(set(ids) - completed))).scalars()) if len(completed) < len(ids) else set()
+    
+    db.session.commit()
+    get_schedule().refresh(*{trip.vehicle_number for trip in trips})
+    
+    results = [{
+        'id': trip_id,
+        'status': 'completed' if trip_id in completed else 'not_active' if trip_id in existing else 'not_found'
+    } for trip_id in ids]
+    
+    return jsonify({
+        'message': f'{len(completed)} of {len(ids)} trips completed',
+        'results': results,
+        'trips': [trip.to_dict() for trip in trips]
+    }), 200
+
 @trips_bp.route('/<int:trip_id>', methods=['DELETE'])
 @jwt_required()
 def delete_trip(trip_id):
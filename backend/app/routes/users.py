@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import User
+from app.models import Depot, Driver, User
+from app.depots import unscoped
+from app.replica import read_replica
+from app.revocation import revoke_user_tokens
 
 users_bp = Blueprint('users', __name__)
 
@@ -9,6 +12,7 @@ MASTER_PHONE = '+9868995742'
 
 @users_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_users():
     """Get all users (managers, admins, and drivers)"""
     current_user_phone = get_jwt_identity()
@@ -23,7 +27,7 @@ def get_users():
         return jsonify({'message': 'Unauthorized'}), 403
     
     # Get all users (managers, admins, users, and drivers)
-    users = User.query.all()
+    users = User.query.order_by(User.created_at).all()
     return jsonify({
         'users': [user.to_dict() for user in users],
         'master_phone': MASTER_PHONE
@@ -59,8 +63,10 @@ def update_user_role(phone):
     if not new_role or new_role not in ['user', 'admin', 'manager', 'driver']:
         return jsonify({'message': 'Invalid role. Must be: user, admin, manager, or driver'}), 400
     
-    # Update role
-    target_user.role = new_role
+    # Update role; tokens issued under the old role stop working
+    if target_user.role != new_role:
+        target_user.role = new_role
+        revoke_user_tokens(target_user.phone)
     db.session.commit()
     
     return jsonify({
@@ -68,6 +74,45 @@ def update_user_role(phone):
         'user': target_user.to_dict()
     }), 200
 
+@users_bp.route('/<phone>/depot', methods=['PUT'])
+@jwt_required()
+def update_user_depot(phone):
+    """Move a user (and their driver record) to another depot (admin/master only)"""
+    current_user_phone = get_jwt_identity()
+    current_user = User.query.filter_by(phone=current_user_phone).first()
+    
+    if not current_user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    # Only admin or master can move users between depots
+    if current_user.role != 'admin' and current_user.phone != MASTER_PHONE:
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    depot = db.session.get(Depot, data.get('depot_id')) if isinstance(data.get('depot_id'), int) else None
+    if not depot:
+        return jsonify({'message': 'Depot not found'}), 404
+    
+    # Admins may move users out of any depot, not only the one they are working in
+    with unscoped():
+        target_user = User.query.filter_by(phone=phone).first()
+        if not target_user:
+            return jsonify({'message': 'Target user not found'}), 404
+        driver = Driver.query.get(phone)
+    
+    # Update depot; tokens issued for the old depot stop working
+    if target_user.depot_id != depot.id:
+        target_user.depot_id = depot.id
+        if driver:
+            driver.depot_id = depot.id
+        revoke_user_tokens(target_user.phone)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Depot updated successfully',
+        'user': target_user.to_dict()
+    }), 200
+
 @users_bp.route('/<phone>', methods=['DELETE'])
 @jwt_required()
 def delete_user(phone):
@@ -91,8 +136,9 @@ def delete_user(phone):
     if target_user.phone == MASTER_PHONE:
         return jsonify({'message': 'Cannot delete master account'}), 403
     
-    # Delete user
+    # Delete user and revoke their outstanding tokens
     db.session.delete(target_user)
+    revoke_user_tokens(target_user.phone)
     db.session.commit()
     
     return jsonify({'message': 'User deleted successfully'}), 200
@@ -2,17 +2,26 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Vehicle
+from app.scheduler import get_schedule
+from app.depots import unscoped
+from app.replica import read_replica
+from app.idempotency import idempotent
+from app.response_cache import cached_response
 
 vehicles_bp = Blueprint('vehicles', __name__)
 
 @vehicles_bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Vehicle)
 def get_vehicles():
-    vehicles = Vehicle.query.all()
+    vehicles = Vehicle.query.order_by(Vehicle.created_at).all()
     return jsonify({'vehicles': [vehicle.to_dict() for vehicle in vehicles]}), 200
 
 @vehicles_bp.route('/<string:vehicle_number>', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(Vehicle)
 def get_vehicle(vehicle_number):
     vehicle = Vehicle.query.get(vehicle_number)
     
@@ -23,6 +32,7 @@ def get_vehicle(vehicle_number):
 
 @vehicles_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_vehicle():
     current_user_phone = get_jwt_identity()
     
@@ -32,8 +42,10 @@ def create_vehicle():
     if not data or not data.get('vehicle_number'):
         return jsonify({'message': 'Missing required fields'}), 400
     
-    # Check if vehicle number already exists
-    if Vehicle.query.filter_by(vehicle_number=data['vehicle_number']).first():
+    # Check if vehicle number already exists (in any depot)
+    with unscoped():
+        taken = Vehicle.query.filter_by(vehicle_number=data['vehicle_number']).first()
+    if taken:
         return jsonify({'message': 'Vehicle number already exists'}), 400
     
     # Create new vehicle
@@ -50,6 +62,7 @@ def create_vehicle():
     
     db.session.add(vehicle)
     db.session.commit()
+    get_schedule().refresh(vehicle.vehicle_number)
     
     return jsonify({
         'message': 'Vehicle created successfully',
@@ -79,6 +92,7 @@ def update_vehicle(vehicle_number):
         vehicle.driver_phone = data['driver_phone']
     
     db.session.commit()
+    get_schedule().refresh(vehicle_number)
     
     return jsonify({
         'message': 'Vehicle updated successfully',
@@ -97,5 +111,6 @@ def delete_vehicle(vehicle_number):
     
     db.session.delete(vehicle)
     db.session.commit()
+    get_schedule().refresh(vehicle_number)
     
     return jsonify({'message': 'Vehicle deleted successfully'}), 200
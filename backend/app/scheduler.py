@@ -0,0 +1,204 @@
+"""Predictive maintenance schedule.
+
+Keeps a min-heap of (due_date, vehicle_number, type) for every vehicle and
+service type in SERVICE_INTERVALS_DAYS / SERVICE_INTERVALS_KM. A vehicle is
+due for a type at the earlier of:
+
+- last record's date + duration_days + the day interval, and
+- the date its recent daily distance will use up the km interval.
+
+The heap is built lazily per worker, then updated one vehicle at a time by
+the routes that write maintenance, trips or vehicles. Superseded heap
+entries are skipped lazily and compacted once they dominate the heap. Since
+each gunicorn worker keeps its own copy, it is also rebuilt after
+MAINTENANCE_SCHEDULE_TTL seconds to pick up writes made by other workers.
+The heap spans every depot; routes filter what they return to the caller's.
+"""
+import heapq
+import re
+import threading
+import time
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.models import Maintenance, Vehicle
+from app.depots import unscoped
+
+
+def parse_window(value, default_days=7):
+    """Parse a window like '7d', '2w', '36h' or '10' (days) into a timedelta."""
+    if not value:
+        return timedelta(days=default_days)
+    match = re.fullmatch(r'\s*(\d+)\s*([hdw]?)\s*', value)
+    if not match:
+        raise ValueError('Invalid window. Use e.g. 7d, 2w or 36h')
+    amount, unit = int(match.group(1)), match.group(2) or 'd'
+    return {'h': timedelta(hours=amount), 'd': timedelta(days=amount),
+            'w': timedelta(weeks=amount)}[unit]
+
+
+class MaintenanceSchedule:
+    def __init__(self, interval_days, interval_km, ttl):
+        self.interval_days = interval_days
+        self.interval_km = interval_km
+        self.types = sorted(set(interval_days) | set(interval_km))
+        self.ttl = ttl
+        self._heap = []
+        self._due = {}  # (vehicle_number, type) -> (due_date, reason)
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    # -- computation -----------------------------------------------------
+
+    def _next_due(self, vehicle, maint_type, last, is_open, today):
+        """Due date and reason for one vehicle/type, or None if already scheduled."""
+        if is_open or vehicle.status == 'inactive':
+            return None
+
+        if last is not None:
+            last_date, duration, last_mileage = last
+            since = last_date + timedelta(days=duration or 0)
+        else:
+            since, last_mileage = vehicle.created_at.date(), 0
+
+        candidates = []
+        days = self.interval_days.get(maint_type)
+        if days:
+            candidates.append((since + timedelta(days=days), f'{days} days since last {maint_type}'))
+
+        km = self.interval_km.get(maint_type)
+        if km:
+            driven = (vehicle.mileage or 0) - (last_mileage or 0)
+            elapsed = (today - since).days
+            if driven >= km:
+                candidates.append((today, f'{driven} km since last {maint_type}'))
+            elif last is not None and elapsed > 0:
+                # Project forward only from a known service point
+                daily = driven / elapsed
+                if daily > 0:
+                    candidates.append((today + timedelta(days=int((km - driven) / daily)),
+                                       f'{km} km projected at {daily:.0f} km/day'))
+
+        return min(candidates) if candidates else None
+
+    def _load(self, vehicle_numbers=None):
+        """Vehicles plus their latest and open maintenance, keyed for _next_due."""
+        # Plain rows rather than entities, so the request's identity map holds
+        # no vehicles from other depots
+        vehicles = db.session.query(Vehicle.vehicle_number, Vehicle.status,
+                                    Vehicle.created_at, Vehicle.mileage)
+        latest = (
+            select(Maintenance.vehicle_number, Maintenance.type,
+                   func.max(Maintenance.date).label('last_date'))
+            .group_by(Maintenance.vehicle_number, Maintenance.type)
+        )
+        records = select(Maintenance.vehicle_number, Maintenance.type, Maintenance.date,
+                         Maintenance.duration_days, Maintenance.mileage, Maintenance.status)
+        if vehicle_numbers is not None:
+            vehicles = vehicles.filter(Vehicle.vehicle_number.in_(vehicle_numbers))
+            latest = latest.where(Maintenance.vehicle_number.in_(vehicle_numbers))
+            records = records.where(Maintenance.vehicle_number.in_(vehicle_numbers))
+        latest = latest.subquery()
+        records = records.join(
+            latest,
+            (Maintenance.vehicle_number == latest.c.vehicle_number)
+            & (Maintenance.type == latest.c.type)
+            & (Maintenance.date == latest.c.last_date),
+        )
+
+        last, open_keys = {}, set()
+        with unscoped():
+            for vn, maint_type, maint_date, duration, mileage, status in db.session.execute(records):
+                last[(vn, maint_type)] = (maint_date, duration, mileage)
+            open_rows = db.session.execute(
+                select(Maintenance.vehicle_number, Maintenance.type)
+                .where(Maintenance.status != 'completed',
+                       *([Maintenance.vehicle_number.in_(vehicle_numbers)] if vehicle_numbers is not None else []))
+            )
+            open_keys.update((vn, t) for vn, t in open_rows)
+            return vehicles.all(), last, open_keys
+
+    def _schedule(self, vehicles, last, open_keys):
+        today = date.today()
+        for vehicle in vehicles:
+            for maint_type in self.types:
+                key = (vehicle.vehicle_number, maint_type)
+                due = self._next_due(vehicle, maint_type, last.get(key), key in open_keys, today)
+                if due is None:
+                    self._due.pop(key, None)
+                elif self._due.get(key) != due:
+                    self._due[key] = due
+                    heapq.heappush(self._heap, (due[0], key[0], key[1]))
+
+    # -- maintenance of the heap -------------------------------------------
+
+    def _ensure_built(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self._heap, self._due = [], {}
+            self._schedule(*self._load())
+            self._built_at = time.monotonic()
+
+    def refresh(self, *vehicle_numbers):
+        """Recompute the schedule of the given vehicles after a write."""
+        with self._lock:
+            if self._built_at is None or not vehicle_numbers:
+                return  # built from scratch on first use
+            vehicles, last, open_keys = self._load(list(vehicle_numbers))
+            found = {v.vehicle_number for v in vehicles}
+            for vn in set(vehicle_numbers) - found:  # deleted vehicles
+                for maint_type in self.types:
+                    self._due.pop((vn, maint_type), None)
+            self._schedule(vehicles, last, open_keys)
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._heap = [(d, vn, t) for (vn, t), (d, _) in self._due.items()]
+                heapq.heapify(self._heap)
+
+    def invalidate(self):
+        """Drop the heap; it is rebuilt on next use."""
+        with self._lock:
+            self._built_at = None
+
+    def due_within(self, window):
+        """Vehicles due before today + window, soonest first.
+
+        Walks the heap as a tree with a small frontier heap, so only the k
+        due entries (plus their children) are visited: O(k log n).
+        """
+        cutoff = date.today() + window
+        with self._lock:
+            self._ensure_built()
+            heap, results, seen = self._heap, [], set()
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier:
+                (due_date, vn, maint_type), i = heapq.heappop(frontier)
+                if due_date > cutoff:
+                    break
+                key = (vn, maint_type)
+                current = self._due.get(key)
+                if current is not None and current[0] == due_date and key not in seen:
+                    seen.add(key)
+                    results.append({
+                        'vehicle_number': vn,
+                        'type': maint_type,
+                        'due_date': due_date.isoformat(),
+                        'overdue': due_date < date.today(),
+                        'reason': current[1],
+                    })
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+            return results
+
+
+def get_schedule():
+    """The current app's MaintenanceSchedule (one per worker process)."""
+    schedule = current_app.extensions.get('maintenance_schedule')
+    if schedule is None:
+        schedule = MaintenanceSchedule(
+            current_app.config['SERVICE_INTERVALS_DAYS'],
+            current_app.config['SERVICE_INTERVALS_KM'],
+            current_app.config['MAINTENANCE_SCHEDULE_TTL'],
+        )
+        current_app.extensions['maintenance_schedule'] = schedule
+    return schedule
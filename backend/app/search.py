@@ -0,0 +1,350 @@
+"""Server-side search over vehicles, drivers and trips.
+
+Three interchangeable backends, picked by SEARCH_BACKEND ('auto' by default):
+
+- fts5:    SQLite FTS5 tables kept in sync by triggers on the source tables
+- trigram: Postgres pg_trgm GIN indexes on the searched columns
+- trie:    in-memory prefix trie per worker, for anything else (or SQLite
+           builds without FTS5); kept current by session commit hooks
+
+Every query token must match (as a prefix) somewhere in the entity's
+searchable fields. Hits from all entity types are merged by score.
+Results only include rows in the caller's depot. The FTS5 tables and the
+trie store each row's depot and filter on it before hits are ranked and
+paged (the trigram backend queries the scoped tables directly), so a page
+is never short because of rows in other depots.
+"""
+import re
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func, or_, select, text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Driver, Trip, Vehicle
+from app.depots import current_depot, unscoped
+
+# entity -> (model, key column, searchable columns)
+SEARCH_FIELDS = {
+    'vehicle': (Vehicle, 'vehicle_number', ('vehicle_number', 'make', 'model', 'license_plate')),
+    'driver': (Driver, 'phone', ('name', 'license_number')),
+    'trip': (Trip, 'id', ('origin', 'destination')),
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+    return [t.lower() for t in _TOKEN_RE.findall(value or '')]
+
+
+def _like_escape(token):
+    """Escape LIKE wildcards (tokens may contain '_') for use with escape='\\'."""
+    return token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    @staticmethod
+    def available(engine):
+        if engine.dialect.name != 'sqlite':
+            return False
+        with engine.connect() as conn:
+            return bool(conn.exec_driver_sql(
+                "SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+    @staticmethod
+    def _spec(entity):
+        model, key, columns = SEARCH_FIELDS[entity]
+        table = model.__tablename__
+        # Integer keys double as the FTS rowid; text keys live in an UNINDEXED column
+        rowid_key = entity == 'trip'
+        return table, f'{table}_fts', key, columns, rowid_key
+
+    def init(self, rebuild=False):
+        for entity in SEARCH_FIELDS:
+            table, fts, key, columns, rowid_key = self._spec(entity)
+            # depot_id is stored (UNINDEXED) so searches filter on it before the LIMIT
+            cols = ', '.join(('depot_id',) + columns)
+            new_vals = ', '.join(f'new.{c}' for c in ('depot_id',) + columns)
+            fts_cols = ', '.join(('depot_id UNINDEXED',) + columns)
+            if rowid_key:
+                create = f"CREATE VIRTUAL TABLE {fts} USING fts5({fts_cols}, prefix='2 3')"
+                insert = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.{key}, {new_vals});'
+                delete = f'DELETE FROM {fts} WHERE rowid = old.{key};'
+                fill = f'INSERT INTO {fts}(rowid, {cols}) SELECT {key}, {cols} FROM {table}'
+            else:
+                create = f"CREATE VIRTUAL TABLE {fts} USING fts5(key UNINDEXED, {fts_cols}, prefix='2 3')"
+                insert = f'INSERT INTO {fts}(key, {cols}) VALUES (new.{key}, {new_vals});'
+                delete = f'DELETE FROM {fts} WHERE key = old.{key};'
+                fill = f'INSERT INTO {fts}(key, {cols}) SELECT {key}, {cols} FROM {table}'
+
+            with db.engine.begin() as conn:
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)).scalar()
+                if exists and not conn.exec_driver_sql(
+                        f"SELECT 1 FROM pragma_table_info('{fts}') WHERE name = 'depot_id'").scalar():
+                    # Built before depots: recreate the table and its triggers with the column
+                    for trigger in ('ai', 'ad', 'au'):
+                        conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+                    conn.exec_driver_sql(f'DROP TABLE {fts}')
+                    exists = False
+                if not exists:
+                    try:
+                        conn.exec_driver_sql(create)
+                    except OperationalError:
+                        # Another process starting at the same time created (and fills) it
+                        exists = True
+                conn.exec_driver_sql(
+                    f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END')
+                conn.exec_driver_sql(
+                    f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END')
+                conn.exec_driver_sql(
+                    f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {key}, {cols} ON {table} '
+                    f'BEGIN {delete} {insert} END')
+                if rebuild or not exists:
+                    conn.exec_driver_sql(f'DELETE FROM {fts}')
+                    conn.exec_driver_sql(fill)
+
+    def search(self, entity, tokens, limit, depot=None):
+        table, fts, key, columns, rowid_key = self._spec(entity)
+        match = ' '.join(f'"{t}"*' for t in tokens)
+        key_col = 'rowid' if rowid_key else 'key'
+        in_depot = '' if depot is None else 'AND depot_id = :depot '
+        rows = db.session.execute(
+            text(f'SELECT {key_col}, bm25({fts}) FROM {fts} WHERE {fts} MATCH :match {in_depot}'
+                 f'ORDER BY bm25({fts}) LIMIT :limit'),
+            {'match': match, 'depot': depot, 'limit': limit},
+        )
+        # bm25 is lower-is-better; flip it so higher scores rank first everywhere
+        return [(-score, entity, k) for k, score in rows]
+
+
+class TrigramBackend:
+    name = 'trigram'
+
+    @staticmethod
+    def available(engine):
+        return engine.dialect.name == 'postgresql'
+
+    def init(self, rebuild=False):
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for model, key, columns in SEARCH_FIELDS.values():
+                table = model.__tablename__
+                for column in columns:
+                    conn.exec_driver_sql(
+                        f'CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm '
+                        f'ON {table} USING gin ({column} gin_trgm_ops)')
+
+    def search(self, entity, tokens, limit, depot=None):
+        # Runs through the ORM, so the depot scope already applies to this SELECT
+        model, key, columns = SEARCH_FIELDS[entity]
+        cols = [getattr(model, c) for c in columns]
+        query = ' '.join(tokens)
+        score = func.greatest(*[func.similarity(func.coalesce(c, ''), query) for c in cols])
+        matches = and_(*[
+            or_(*[c.ilike(f'%{_like_escape(t)}%', escape='\\') for c in cols]) for t in tokens
+        ])
+        rows = db.session.execute(
+            select(getattr(model, key), score).where(matches).order_by(score.desc()).limit(limit)
+        )
+        return [(float(s), entity, k) for k, s in rows]
+
+
+class _TrieNode:
+    __slots__ = ('children', 'prefix', 'exact')
+
+    def __init__(self):
+        self.children = {}
+        self.prefix = set()  # documents with a token starting here
+        self.exact = set()   # documents with a token ending here
+
+
+class TrieBackend:
+    """Prefix trie of tokens -> (entity, key). Lookups are O(len(token)).
+
+    Documents of every depot share the trie; each remembers its depot.
+    """
+    name = 'trie'
+
+    @staticmethod
+    def available(engine):
+        return True
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._root = _TrieNode()
+        self._docs = {}  # (entity, key) -> (depot, tokens)
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def init(self, rebuild=False):
+        if rebuild:
+            self._built_at = None
+
+    def _add(self, doc, depot, tokens):
+        self._docs[doc] = (depot, tokens)
+        for token in tokens:
+            node = self._root
+            for ch in token:
+                node = node.children.setdefault(ch, _TrieNode())
+                node.prefix.add(doc)
+            node.exact.add(doc)
+
+    def _remove(self, doc):
+        for token in self._docs.pop(doc, (None, ()))[1]:
+            node = self._root
+            for ch in token:
+                node = node.children.get(ch)
+                if node is None:
+                    break
+                node.prefix.discard(doc)
+            else:
+                node.exact.discard(doc)
+
+    def _ensure_built(self):
+        if self._built_at is not None and time.monotonic() - self._built_at <= self.ttl:
+            return
+        self._root, self._docs = _TrieNode(), {}
+        for entity, (model, key, columns) in SEARCH_FIELDS.items():
+            fields = [getattr(model, key), model.depot_id] + [getattr(model, c) for c in columns]
+            with unscoped():
+                for row in db.session.execute(select(*fields)).yield_per(5000):
+                    self._add((entity, row[0]), row[1], {t for v in row[2:] for t in tokenize(str(v or ''))})
+        self._built_at = time.monotonic()
+
+    def apply(self, changes):
+        """Apply committed changes: (entity, key, depot, text or None when deleted)."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            for entity, key, depot, value in changes:
+                self._remove((entity, key))
+                if value is not None:
+                    self._add((entity, key), depot, set(tokenize(value)))
+
+    def _lookup(self, token):
+        node = self._root
+        for ch in token:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def search(self, entity, tokens, limit, depot=None):
+        with self._lock:
+            self._ensure_built()
+            nodes = [self._lookup(t) for t in tokens]
+            if any(n is None for n in nodes):
+                return []
+            nodes.sort(key=lambda n: len(n.prefix))
+            hits = [d for d in nodes[0].prefix
+                    if d[0] == entity and (depot is None or self._docs[d][0] == depot)]
+            for node in nodes[1:]:
+                hits = [d for d in hits if d in node.prefix]
+            # Exact token matches rank above prefix matches
+            scored = [(sum(2 if d in n.exact else 1 for n in nodes), d[0], d[1]) for d in hits]
+        scored.sort(key=lambda hit: (-hit[0], str(hit[2])))
+        return scored[:limit]
+
+
+def _document_text(entity, obj):
+    model, key, columns = SEARCH_FIELDS[entity]
+    return ' '.join(str(getattr(obj, c) or '') for c in columns) + f' {getattr(obj, key)}'
+
+
+_ENTITY_BY_MODEL = {model: entity for entity, (model, key, columns) in SEARCH_FIELDS.items()}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_search_changes(session, flush_context):
+    """Queue trie updates for indexed rows; applied only once committed."""
+    if not has_app_context() or not isinstance(current_app.extensions.get('search'), TrieBackend):
+        return
+    pending = session.info.setdefault('search_changes', [])
+    for obj in list(session.new) + list(session.dirty):
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity:
+            key = getattr(obj, SEARCH_FIELDS[entity][1])
+            pending.append((entity, key, obj.depot_id, _document_text(entity, obj)))
+    for obj in session.deleted:
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity:
+            pending.append((entity, getattr(obj, SEARCH_FIELDS[entity][1]), None, None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    changes = session.info.pop('search_changes', None)
+    if changes and has_app_context():
+        backend = current_app.extensions.get('search')
+        if isinstance(backend, TrieBackend):
+            backend.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_search_changes(session, previous_transaction):
+    session.info.pop('search_changes', None)
+
+
+def get_search_backend():
+    """The configured backend for the current app, created on first use."""
+    backend = current_app.extensions.get('search')
+    if backend is None:
+        choice = current_app.config['SEARCH_BACKEND']
+        candidates = {'fts5': Fts5Backend, 'trigram': TrigramBackend, 'trie': TrieBackend}
+        if choice == 'auto':
+            cls = next(c for c in (Fts5Backend, TrigramBackend, TrieBackend)
+                       if c.available(db.engine))
+        else:
+            cls = candidates[choice]
+        backend = cls(current_app.config['SEARCH_INDEX_TTL']) if cls is TrieBackend else cls()
+        try:
+            backend.init()
+        except SQLAlchemyError:
+            if cls is TrieBackend:
+                raise
+            # e.g. CREATE EXTENSION pg_trgm without the privilege; search must not take the app down
+            current_app.logger.warning('Search backend %s unavailable, falling back to trie',
+                                       cls.name, exc_info=True)
+            backend = TrieBackend(current_app.config['SEARCH_INDEX_TTL'])
+            backend.init()
+        current_app.extensions['search'] = backend
+    return backend
+
+
+def search(query, entities=None, page=1, per_page=20):
+    """Ranked, paginated hits across entity types.
+
+    Returns (hits, backend name); each hit is {'type', 'id', 'score', 'item'}.
+    """
+    tokens = tokenize(query)
+    backend = get_search_backend()
+    if not tokens:
+        return [], backend.name
+
+    window = page * per_page
+    depot = current_depot()
+    hits = []
+    for entity in entities or SEARCH_FIELDS:
+        hits.extend(backend.search(entity, tokens, window, depot))
+    hits.sort(key=lambda hit: -hit[0])
+    hits = hits[(page - 1) * per_page:window]
+
+    # Load only the rows on this page
+    by_entity = {}
+    for score, entity, key in hits:
+        by_entity.setdefault(entity, []).append(key)
+    loaded = {}
+    for entity, keys in by_entity.items():
+        model, key, columns = SEARCH_FIELDS[entity]
+        for obj in model.query.filter(getattr(model, key).in_(keys)):
+            loaded[(entity, getattr(obj, key))] = obj.to_dict()
+
+    return [
+        {'type': entity, 'id': key, 'score': score, 'item': loaded[(entity, key)]}
+        for score, entity, key in hits if (entity, key) in loaded
+    ], backend.name
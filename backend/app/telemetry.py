@@ -0,0 +1,296 @@
+"""Vehicle GPS telemetry.
+
+Pings arrive in batches, either as NDJSON (one JSON object per line) or in
+a compact binary format, and are appended to ``telemetry_pings`` with one
+multi-row INSERT per batch. Each worker keeps the last known position of
+every vehicle it has seen in memory; entries older than
+TELEMETRY_POSITION_TTL are re-read from the table, since other workers may
+have received newer pings. Each re-read is an index lookup of the newest
+ping per vehicle, never a scan of the whole table.
+
+Binary format (``application/octet-stream``, little-endian), a sequence of
+per-vehicle blocks:
+
+    uint8   length of vehicle number
+    bytes   vehicle number (UTF-8)
+    uint16  number of records
+    records of 14 bytes each:
+        uint32  ts, seconds since the Unix epoch (UTC)
+        int32   lat, degrees * 1e7
+        int32   lon, degrees * 1e7
+        uint16  speed, km/h * 100
+
+Completed trips without an entered distance get it from their vehicle's
+track between the trip's creation and completion.
+"""
+import json
+import math
+import struct
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.audit import stage
+from app.models import TelemetryPing, Trip, Vehicle
+
+NDJSON = 'application/x-ndjson'
+BINARY = 'application/octet-stream'
+
+_BLOCK_HEAD = struct.Struct('<B')
+_BLOCK_COUNT = struct.Struct('<H')
+_RECORD = struct.Struct('<IiiH')
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class TelemetryError(ValueError):
+    """The request body could not be parsed at all."""
+
+
+def _valid(lat, lon):
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def _timestamp(value):
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value)
+    # ISO 8601; an explicit offset is converted to naive UTC like every other column
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = datetime.utcfromtimestamp(parsed.timestamp())
+    return parsed
+
+
+def parse_ndjson(body):
+    """(pings, errors) from NDJSON; errors are (line number, message)."""
+    pings, errors = [], []
+    for number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            lat, lon = float(item['lat']), float(item['lon'])
+            if not _valid(lat, lon):
+                raise ValueError('lat/lon out of range')
+            speed = item.get('speed')
+            pings.append({
+                'vehicle_number': str(item['vehicle_number']),
+                'ts': _timestamp(item['ts']),
+                'lat': lat,
+                'lon': lon,
+                'speed': None if speed is None else float(speed),
+            })
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError, OSError) as exc:
+            errors.append((number, str(exc) or type(exc).__name__))
+    return pings, errors
+
+
+def parse_binary(body):
+    """(pings, errors) from the binary block format; errors are (record index, message)."""
+    pings, errors = [], []
+    view, offset, index = memoryview(body), 0, 0
+    try:
+        while offset < len(view):
+            (length,) = _BLOCK_HEAD.unpack_from(view, offset)
+            offset += _BLOCK_HEAD.size
+            vehicle_number = bytes(view[offset:offset + length]).decode('utf-8')
+            offset += length
+            (count,) = _BLOCK_COUNT.unpack_from(view, offset)
+            offset += _BLOCK_COUNT.size
+            end = offset + count * _RECORD.size
+            if end > len(view):
+                raise TelemetryError('Truncated telemetry block')
+            for ts, lat, lon, speed in _RECORD.iter_unpack(view[offset:end]):
+                lat, lon = lat / 1e7, lon / 1e7
+                if _valid(lat, lon):
+                    pings.append({'vehicle_number': vehicle_number, 'ts': datetime.utcfromtimestamp(ts),
+                                  'lat': lat, 'lon': lon, 'speed': speed / 100})
+                else:
+                    errors.append((index, 'lat/lon out of range'))
+                index += 1
+            offset = end
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise TelemetryError(f'Malformed telemetry body: {exc}')
+    return pings, errors
+
+
+def encode_binary(pings):
+    """Binary body for ``pings`` (dicts as produced by the parsers, ts may be epoch seconds)."""
+    blocks = {}
+    for ping in pings:
+        blocks.setdefault(ping['vehicle_number'], []).append(ping)
+    out = bytearray()
+    for vehicle_number, items in blocks.items():
+        name = vehicle_number.encode('utf-8')
+        for start in range(0, len(items), 0xFFFF):
+            chunk = items[start:start + 0xFFFF]
+            out += _BLOCK_HEAD.pack(len(name)) + name + _BLOCK_COUNT.pack(len(chunk))
+            for p in chunk:
+                ts = p['ts'] if isinstance(p['ts'], (int, float)) else p['ts'].timestamp()
+                out += _RECORD.pack(int(ts), round(p['lat'] * 1e7), round(p['lon'] * 1e7),
+                                    round((p.get('speed') or 0) * 100))
+    return bytes(out)
+
+
+class PositionCache:
+    """Last known position per vehicle in this worker."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._positions = {}  # vehicle_number -> (ping dict, cached at)
+        self._lock = threading.Lock()
+
+    def update(self, pings, now=None):
+        now = now or time.monotonic()
+        latest = {}
+        for ping in pings:
+            current = latest.get(ping['vehicle_number'])
+            if current is None or ping['ts'] >= current['ts']:
+                latest[ping['vehicle_number']] = ping
+        with self._lock:
+            for vehicle_number, ping in latest.items():
+                cached = self._positions.get(vehicle_number)
+                if cached is None or ping['ts'] >= cached[0]['ts']:
+                    self._positions[vehicle_number] = (ping, now)
+                else:  # older ping arrived late; the cached one is still the newest
+                    self._positions[vehicle_number] = (cached[0], now)
+
+    def get(self, vehicle_number):
+        """Fresh cached position, or None when it must be read from the table."""
+        cached = self._positions.get(vehicle_number)
+        if cached is not None and time.monotonic() - cached[1] <= self.ttl:
+            return cached[0]
+        return None
+
+
+def get_position_cache():
+    cache = current_app.extensions.get('telemetry_positions')
+    if cache is None:
+        cache = PositionCache(current_app.config['TELEMETRY_POSITION_TTL'])
+        current_app.extensions['telemetry_positions'] = cache
+    return cache
+
+
+def ingest(pings):
+    """Append pings for known vehicles in one INSERT and commit.
+
+    Returns the vehicle numbers that were not found (their pings are dropped).
+    """
+    names = {ping['vehicle_number'] for ping in pings}
+    known = set(db.session.execute(
+        select(Vehicle.vehicle_number).where(Vehicle.vehicle_number.in_(names))).scalars())
+    unknown = names - known
+    if unknown:
+        pings = [ping for ping in pings if ping['vehicle_number'] in known]
+    if pings:
+        db.session.execute(insert(TelemetryPing.__table__), pings)
+    db.session.commit()
+    get_position_cache().update(pings)
+    return unknown
+
+
+def _ping_dict(row):
+    return {'vehicle_number': row.vehicle_number, 'ts': row.ts,
+            'lat': row.lat, 'lon': row.lon, 'speed': row.speed}
+
+
+def last_positions(vehicle_numbers=None):
+    """Latest ping per vehicle, as {'vehicle_number', 'ts', 'lat', 'lon', 'speed'} dicts.
+
+    ``None`` means every vehicle. Served from the worker's cache when fresh;
+    the rest are read with one query that looks up each vehicle's newest
+    ping on the (vehicle_number, ts) index, so the cost grows with the
+    number of vehicles, not with the size of the append-only table.
+    """
+    vehicles = Vehicle.__table__
+    if vehicle_numbers is None:
+        vehicle_numbers = db.session.execute(select(vehicles.c.vehicle_number)).scalars().all()
+    cache = get_position_cache()
+    positions, missing = {}, []
+    for vehicle_number in vehicle_numbers:
+        cached = cache.get(vehicle_number)
+        if cached is not None:
+            positions[vehicle_number] = cached
+        else:
+            missing.append(vehicle_number)
+    if not missing:
+        return positions
+
+    newest = (
+        select(TelemetryPing.id)
+        .where(TelemetryPing.vehicle_number == vehicles.c.vehicle_number)
+        .order_by(TelemetryPing.ts.desc(), TelemetryPing.id.desc())
+        .limit(1)
+        .correlate(vehicles)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        select(TelemetryPing.vehicle_number, TelemetryPing.ts, TelemetryPing.lat,
+               TelemetryPing.lon, TelemetryPing.speed)
+        .select_from(vehicles)
+        .join(TelemetryPing, TelemetryPing.id == newest)
+        .where(vehicles.c.vehicle_number.in_(missing))
+    )
+    loaded = [_ping_dict(row) for row in rows]
+    cache.update(loaded)
+    for ping in loaded:
+        positions[ping['vehicle_number']] = ping
+    return positions
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def fill_trip_distances(trips):
+    """Set the distance of completed trips that have none from their GPS track (caller commits).
+
+    One query reads the pings of every such trip's vehicle within the trip's
+    window (created_at .. completed_at); trips with fewer than two pings keep
+    their distance.
+    """
+    pending = [trip for trip in trips if not trip.distance and trip.created_at and trip.completed_at]
+    if not pending:
+        return
+
+    rows = db.session.execute(
+        select(TelemetryPing.vehicle_number, TelemetryPing.ts, TelemetryPing.lat, TelemetryPing.lon)
+        .where(or_(*[and_(TelemetryPing.vehicle_number == trip.vehicle_number,
+                          TelemetryPing.ts.between(trip.created_at, trip.completed_at))
+                     for trip in pending]))
+        .order_by(TelemetryPing.vehicle_number, TelemetryPing.ts)
+    ).all()
+    tracks = {}
+    for row in rows:
+        tracks.setdefault(row.vehicle_number, []).append(row)
+
+    distances = []
+    for trip in pending:
+        track = [row for row in tracks.get(trip.vehicle_number, ())
+                 if trip.created_at <= row.ts <= trip.completed_at]
+        if len(track) < 2:
+            continue
+        distance = sum(haversine_km(a.lat, a.lon, b.lat, b.lon) for a, b in zip(track, track[1:]))
+        distances.append({'trip_id': trip.id, 'new_distance': round(distance, 3)})
+    if not distances:
+        return
+
+    trips_table = Trip.__table__
+    db.session.execute(
+        update(trips_table)
+        .where(trips_table.c.id == bindparam('trip_id'))
+        .values(distance=bindparam('new_distance')),
+        distances,
+    )
+    by_id = {trip.id: trip for trip in pending}
+    for item in distances:
+        trip = by_id[item['trip_id']]
+        stage(db.session(), 'update', Trip.__tablename__, trip.id,
+              {'distance': [trip.distance, item['new_distance']]}, trip.depot_id)
+        set_committed_value(trip, 'distance', item['new_distance'])
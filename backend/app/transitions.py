@@ -0,0 +1,66 @@
+"""Atomic state transitions for versioned models.
+
+Vehicle, Trip and Maintenance carry an optimistic ``version`` column. A
+transition is a single conditional ``UPDATE ... WHERE <criteria>`` that also
+bumps the version, so two dispatchers racing on the same row cannot both
+win: the loser's statement matches no rows and the route answers 409.
+Models without a version column (drivers) get the same conditional UPDATE.
+"""
+from sqlalchemy import inspect, select, update
+from app import db
+from app.audit import jsonable, snapshot, stage
+
+
+def transition(model, *criteria, **values):
+    """Apply ``values`` to the rows of ``model`` matching ``criteria``.
+
+    Returns the number of rows changed; 0 means the expected state no longer
+    holds (someone else got there first). The caller commits.
+    """
+    return len(transition_ids(model, *criteria, **values))
+
+
+def transition_ids(model, *criteria, **values):
+    """Like ``transition``, but returns the primary keys of the changed rows.
+
+    Each changed row is recorded in the audit log, with before values for
+    rows already loaded in the session.
+    """
+    pk = inspect(model).primary_key
+    # Values of loaded rows before the UPDATE refreshes them
+    loaded = {
+        key[1][0]: snapshot(obj, values)
+        for key, obj in db.session.identity_map.items()
+        if key[0] is model and len(key[1]) == 1
+    }
+
+    stmt = (
+        update(model)
+        .where(*criteria)
+        .values(**values)
+        .execution_options(synchronize_session='fetch')
+    )
+    if 'version' in inspect(model).columns:
+        stmt = stmt.values(version=model.version + 1)
+    keys = list(values)
+    columns = (*pk, model.depot_id, *[getattr(model, key) for key in keys])
+    if db.engine.dialect.update_returning:
+        # RETURNING gives the changed ids, depots and new values in the same round trip
+        changed = db.session.execute(stmt.returning(*columns)).all()
+    else:
+        # Lock the matching rows so the UPDATE changes exactly these, then read
+        # back their new values (``values`` may be SQL expressions)
+        ids = db.session.execute(
+            select(*pk).where(*criteria).with_for_update()).scalars().all()
+        if not ids:
+            return []
+        db.session.execute(stmt.where(pk[0].in_(ids)))
+        changed = db.session.execute(
+            select(*columns).where(pk[0].in_(ids))).all()
+    for row in changed:
+        row_id, depot_id, after = row[0], row[1], row[2:]
+        before = loaded.get(row_id, {})
+        stage(db.session(), 'update', model.__tablename__, row_id, {
+            key: [before.get(key), jsonable(value)] for key, value in zip(keys, after)
+        }, depot_id)
+    return [row[0] for row in changed]
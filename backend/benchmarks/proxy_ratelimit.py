@@ -0,0 +1,95 @@
+"""Rate limit buckets of anonymous clients behind a proxy (Heroku's router).
+
+Runs in-process against a throwaway SQLite database with every request
+arriving from the router's address, like on Heroku, and the auth budget
+lowered to --budget per minute:
+
+- with RATELIMIT_TRUSTED_PROXIES=1, each client (the address the router
+  appends to X-Forwarded-For) gets its own bucket: one client exhausting
+  its budget does not throttle another, and prepending fake addresses to
+  the header does not buy a fresh bucket
+- with DYNO set and RATELIMIT_TRUSTED_PROXIES unset, the default is 1
+- with 0 trusted proxies every client shares the router's bucket, and the
+  misconfiguration is logged
+
+Exits non-zero on the first violation. Run from backend/:
+
+    python benchmarks/proxy_ratelimit.py [--budget 5]
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+
+ROUTER = '10.1.2.3'
+
+
+def make_app(budget, trusted_proxies):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'proxy.db')
+        RATELIMIT_ENABLED = True
+        RATELIMIT_STORAGE = 'memory'
+        RATELIMIT_TRUSTED_PROXIES = trusted_proxies
+        RATE_LIMITS = {**Config.RATE_LIMITS, 'auth': f'{budget}/minute'}
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def login(client, forwarded_for):
+    """Status of a failed login from ``forwarded_for`` as seen through the router."""
+    return client.post('/api/auth/login', json={'phone': '+10000', 'password': 'wrong'},
+                       headers={'X-Forwarded-For': forwarded_for},
+                       environ_base={'REMOTE_ADDR': ROUTER}).status_code
+
+
+def check(name, ok):
+    print(f"{name}: {'OK' if ok else 'FAILED'}")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=int, default=5)
+    args = parser.parse_args()
+
+    client = make_app(args.budget, 1).test_client()
+    first = [login(client, '203.0.113.7') for _ in range(args.budget + 1)]
+    check('client A is throttled after its budget', 429 not in first[:-1] and first[-1] == 429)
+    check('client B keeps its own bucket', login(client, '198.51.100.9') != 429)
+    check('a spoofed X-Forwarded-For prefix does not reset A',
+          login(client, '192.0.2.55, 203.0.113.7') == 429)
+
+    default = subprocess.run(
+        [sys.executable, '-c', 'from app.config import Config; print(Config.RATELIMIT_TRUSTED_PROXIES)'],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={k: v for k, v in {**os.environ, 'DYNO': 'web.1'}.items() if k != 'RATELIMIT_TRUSTED_PROXIES'},
+    ).stdout.strip()
+    check('DYNO defaults RATELIMIT_TRUSTED_PROXIES to 1', default == '1')
+
+    app = make_app(args.budget, 0)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    app.logger.addHandler(handler)
+    client = app.test_client()
+    for _ in range(args.budget):
+        login(client, '203.0.113.7')
+    check('without trusted proxies all clients share the router bucket',
+          login(client, '198.51.100.9') == 429)
+    check('the misconfiguration is logged',
+          any('RATELIMIT_TRUSTED_PROXIES' in record.getMessage() for record in records))
+
+
+if __name__ == '__main__':
+    main()
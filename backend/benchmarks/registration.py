@@ -0,0 +1,75 @@
+"""Registrations/sec through POST /api/auth/register with DNS unavailable.
+
+DNS is made unreachable by pointing the resolvers at a black-hole address
+(192.0.2.1, TEST-NET-1), so every lookup runs into its timeout. Runs
+in-process against a throwaway SQLite database. Run from backend/:
+
+    python benchmarks/registration.py [--count 300] [--bcrypt-rounds 4] [--baseline]
+
+bcrypt dominates a real registration (about 0.25s at the default 12 rounds),
+so the default of 4 rounds isolates the rest of the path. --baseline also
+times one call of the previous check, validate_email() with its default DNS
+deliverability lookup.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import dns.resolver  # noqa: E402
+from email_validator import validate_email  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.email_check import _domain_cache  # noqa: E402
+
+BLACK_HOLE = ['192.0.2.1']
+
+
+def run(count, rounds, deliverability, offset):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        RATELIMIT_ENABLED = False
+        BCRYPT_LOG_ROUNDS = rounds
+        EMAIL_CHECK_DELIVERABILITY = deliverability
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        if deliverability:
+            _domain_cache().resolver.nameservers = BLACK_HOLE
+    client = app.test_client()
+
+    started = time.perf_counter()
+    for i in range(offset, offset + count):
+        response = client.post('/api/auth/register', json={
+            'phone': f'+1{i:09d}', 'email': f'driver{i}@fleet-bench.com', 'password': 'secret',
+            'license_number': f'BENCH{i}', 'name': f'Driver {i}',
+        })
+        assert response.status_code == 201, response.get_json()
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=300)
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--baseline', action='store_true')
+    args = parser.parse_args()
+
+    dns.resolver.get_default_resolver().nameservers = BLACK_HOLE
+
+    print(f'syntax only (default)        {run(args.count, args.bcrypt_rounds, False, 0):8.1f} registrations/sec')
+    print(f'with deliverability check    {run(args.count, args.bcrypt_rounds, True, args.count):8.1f} registrations/sec')
+
+    if args.baseline:
+        started = time.perf_counter()
+        validate_email('driver@fleet-bench.com')
+        elapsed = time.perf_counter() - started
+        print(f'previous validate_email()    {1 / elapsed:8.3f} registrations/sec (one DNS lookup: {elapsed:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
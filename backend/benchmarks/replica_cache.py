@@ -0,0 +1,95 @@
+"""Response cache behind a lagging read replica (app/response_cache.py).
+
+Runs in-process with a throwaway SQLite primary and a copy of it as the
+replica, which is only brought up to date when the script says so:
+
+- a vehicle is created on the primary while the replica lags
+- another caller lists vehicles and is served from the replica, without
+  the new vehicle (the lag itself is expected)
+- the replica catches up; every caller must now see the vehicle, i.e. the
+  stale replica response must not have been cached under the generation
+  that already included the write
+
+Exits non-zero on the first violation. Run from backend/:
+
+    python benchmarks/replica_cache.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.depots import ensure_default_depot  # noqa: E402
+from app.models import User  # noqa: E402
+
+WRITER, READERS = '+10000', ('+10001', '+10002')
+
+
+def make_app():
+    directory = tempfile.mkdtemp()
+    primary, replica = (os.path.join(directory, name) for name in ('primary.db', 'replica.db'))
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + primary
+        SQLALCHEMY_BINDS = {'replica': 'sqlite:///' + replica}
+        RATELIMIT_ENABLED = False
+        RESPONSE_CACHE_STORAGE = 'memory'
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        ensure_default_depot()
+        db.session.add_all([User(phone=phone, email=f'u{phone[1:]}@fleet-bench.com', role='admin',
+                                 password_hash='x') for phone in (WRITER, *READERS)])
+        db.session.commit()
+        headers = {phone: {'Authorization': 'Bearer ' + create_access_token(
+            identity=phone, additional_claims={'role': 'admin', 'depot': 1})}
+            for phone in (WRITER, *READERS)}
+
+    def sync():
+        """Bring the replica up to date with the primary."""
+        with app.app_context():
+            db.engines['replica'].dispose()
+        shutil.copyfile(primary, replica)
+
+    sync()
+    return app, headers, sync
+
+
+def check(name, ok):
+    print(f"{name}: {'OK' if ok else 'FAILED'}")
+    if not ok:
+        sys.exit(1)
+
+
+def listed(response):
+    return [vehicle['vehicle_number'] for vehicle in response.get_json()['vehicles']]
+
+
+def main():
+    app, headers, sync = make_app()
+    # Separate clients: the sticky cookie of the writer must not reach the readers
+    writer, first, second = (app.test_client() for _ in range(3))
+
+    check('the vehicle is created on the primary',
+          writer.post('/api/vehicles/', json={'vehicle_number': 'LAG1'},
+                      headers=headers[WRITER]).status_code == 201)
+
+    lagging = first.get('/api/vehicles/', headers=headers[READERS[0]])
+    check('a reader is served by the lagging replica',
+          lagging.headers.get('X-Database') == 'replica' and 'LAG1' not in listed(lagging))
+
+    sync()
+    for name, client, phone in (('the same reader', first, READERS[0]),
+                                ('another reader', second, READERS[1])):
+        response = client.get('/api/vehicles/', headers=headers[phone])
+        check(f'{name} sees the vehicle once the replica caught up ({response.headers.get("X-Cache")})',
+              'LAG1' in listed(response))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Latency of a request while slow clients hold connections open, sync vs gevent.
+
+Starts gunicorn with gunicorn.conf.py twice against a throwaway SQLite
+database, once with sync workers and once with WORKER_CLASS=gevent. For
+each, it opens --slow connections that send half a request and then stall
+(like a slow mobile client or a long poll), then times a normal
+``GET /api/auth/me``. Sync workers give each stalled connection a whole
+process, so once there are as many as workers the request waits; gevent
+workers park a greenlet per connection and keep serving.
+
+It also times the same request while --logins logins are hashing
+passwords with bcrypt. Under gevent ``run_blocking`` moves the hashing
+to the hub's thread pool, so other greenlets keep being served (on a
+machine with fewer cores than logins the hashing still competes with them
+for CPU).
+
+Run from backend/:
+
+    python benchmarks/slow_clients.py [--workers 4] [--slow 500] [--timeout 8]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+PASSWORD = 'bench-password'
+
+
+def seed(env, logins):
+    """Create the database and users; return an access token."""
+    os.environ.update(env)
+    from app import create_app, db
+    from app.depots import ensure_default_depot
+    from app.models import User
+    from flask_jwt_extended import create_access_token
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ensure_default_depot()
+        for i in range(logins + 1):
+            user = User(phone=f'+1{i:05d}', email=f'user{i}@fleet-bench.com', role='admin')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        db.session.commit()
+        return create_access_token(identity='+100000', additional_claims={'role': 'admin', 'depot': 1})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(url, token, timeout):
+    started = time.perf_counter()
+    request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def login(base, phone, timeout):
+    started = time.perf_counter()
+    request = urllib.request.Request(
+        base + '/api/auth/login', data=json.dumps({'phone': phone, 'password': PASSWORD}).encode(),
+        headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def stall(port):
+    """Open a connection that sends half a request and never finishes it."""
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(b'GET /api/auth/me HTTP/1.1\r\nHost: localhost\r\n')
+    return sock
+
+
+def run(worker_class, args, env, token):
+    port = free_port()
+    cmd = [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}',
+           '-c', os.path.join(BACKEND, 'gunicorn.conf.py'), 'main:app']
+    proc = subprocess.Popen(cmd, cwd=BACKEND,
+                            env={**os.environ, **env, 'WORKER_CLASS': worker_class,
+                                 'WEB_CONCURRENCY': str(args.workers),
+                                 'WORKER_TIMEOUT': str(args.timeout * 4)},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    sockets = []
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                get(base + '/api/auth/me', token, 5)
+                break
+            except OSError:
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError(f'{worker_class}: gunicorn did not start')
+                time.sleep(0.05)
+
+        with ThreadPoolExecutor(args.logins) as pool:
+            logins = [pool.submit(login, base, f'+1{i + 1:05d}', 60) for i in range(args.logins)]
+            time.sleep(0.1)
+            during_logins = round(get(base + '/api/auth/me', token, 60), 1)
+            for future in logins:
+                future.result()
+
+        sockets = [stall(port) for _ in range(args.slow)]
+        time.sleep(0.5)
+        try:
+            latency = round(get(base + '/api/auth/me', token, args.timeout), 1)
+        except (urllib.error.URLError, socket.timeout):
+            latency = f'timed out after {args.timeout}s'
+    finally:
+        for sock in sockets:
+            sock.close()
+        proc.terminate()
+        proc.wait()
+
+    return {
+        'worker_class': worker_class,
+        'stalled_connections': args.slow,
+        'request_ms': latency,
+        'request_during_logins_ms': during_logins,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--slow', type=int, default=500)
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--timeout', type=int, default=8)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    env = {
+        'DATABASE_URL': 'sqlite:///' + os.path.join(directory, 'bench.db'),
+        'RATELIMIT_ENABLED': 'false',
+    }
+    token = seed(env, args.logins)
+    for worker_class in ('sync', 'gevent'):
+        print(json.dumps(run(worker_class, args, env, token)))
+
+
+if __name__ == '__main__':
+    main()
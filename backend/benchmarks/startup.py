@@ -0,0 +1,164 @@
+"""First-request latency and worker memory under gunicorn, with and without preload.
+
+Starts gunicorn three ways against a throwaway SQLite database seeded with a
+hundred rows, and for each reports the time until the first response,
+the latency of every worker's first request to each hot endpoint, and the
+memory of each worker (RSS, PSS and private pages from smaps_rollup):
+
+- baseline: no config, so no hooks (the previous Procfile behaviour)
+- warm:     gunicorn.conf.py with PRELOAD_APP=false, each worker warms itself
+- preload:  gunicorn.conf.py default for sync workers, warmed once in the master
+
+Linux only (reads /proc). Run from backend/:
+
+    python benchmarks/startup.py [--workers 4] [--rows 100]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+
+ENDPOINTS = ['/api/auth/me', '/api/vehicles/', '/api/drivers/', '/api/trips/',
+             '/api/maintenance/', '/api/users/', '/api/maintenance/due']
+
+
+def seed(env, rows):
+    """Create the database and return an admin access token."""
+    os.environ.update(env)
+    from app import create_app, db
+    from app.depots import ensure_default_depot
+    from app.models import Driver, Trip, User, Vehicle
+    from flask_jwt_extended import create_access_token
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ensure_default_depot()
+        admin = User(phone='+10000', email='admin@fleet-bench.com', role='admin')
+        admin.password_hash = 'x'
+        db.session.add(admin)
+        for i in range(rows):
+            db.session.add(Vehicle(vehicle_number=f'BENCH{i}', make='Make', model='Model'))
+            db.session.add(Driver(phone=f'+2{i:09d}', name=f'Driver {i}', license_number=f'LIC{i}'))
+        db.session.flush()
+        for i in range(rows):
+            db.session.add(Trip(vehicle_number=f'BENCH{i}', driver_phone=f'+2{i:09d}',
+                                origin='A', destination='B', date=date(2026, 1, 1), status='active'))
+        db.session.commit()
+        return create_access_token(identity='+10000', additional_claims={'role': 'admin', 'depot': 1})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(url, token):
+    started = time.perf_counter()
+    request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def run(mode, workers, env, token, config):
+    port = free_port()
+    cmd = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+           '-c', config, 'main:app']
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        while True:
+            try:
+                get(base + '/api/auth/me', token)
+                break
+            except OSError:
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError(f'{mode}: gunicorn did not start')
+                time.sleep(0.02)
+        first_response = time.perf_counter() - started
+        # Let every worker finish booting so only first-request work is measured
+        while len(children(proc.pid)) < workers:
+            time.sleep(0.05)
+        time.sleep(3)
+
+        # Sync workers take one request at a time, so N concurrent requests
+        # land on N different workers: each is that worker's first hit
+        first, steady = [], []
+        with ThreadPoolExecutor(workers) as pool:
+            for path in ENDPOINTS:
+                first += pool.map(lambda _: get(base + path, token), range(workers))
+            for path in ENDPOINTS:
+                steady += pool.map(lambda _: get(base + path, token), range(workers))
+        mem = [memory(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return {
+        'mode': mode,
+        'first_response_s': round(first_response, 2),
+        'first_request_ms': {'mean': round(statistics.mean(first), 1), 'max': round(max(first), 1)},
+        'steady_request_ms': {'mean': round(statistics.mean(steady), 1)},
+        'first_request_overhead_ms': round(statistics.mean(first) - statistics.mean(steady), 1),
+        'worker_mb': {key: round(statistics.mean(m[key] for m in mem), 1)
+                      for key in ('rss', 'pss', 'private')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=100)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    env = {
+        'DATABASE_URL': 'sqlite:///' + os.path.join(directory, 'bench.db'),
+        'RATELIMIT_ENABLED': 'false',
+        'RESPONSE_CACHE_ENABLED': 'false',
+    }
+    token = seed(env, args.rows)
+    baseline_config = os.path.join(directory, 'empty.conf.py')
+    open(baseline_config, 'w').close()
+    config = os.path.join(BACKEND, 'gunicorn.conf.py')
+
+    for mode, extra, conf in [('baseline', {}, baseline_config),
+                              ('warm', {'PRELOAD_APP': 'false'}, config),
+                              ('preload', {'PRELOAD_APP': 'true'}, config)]:
+        print(json.dumps(run(mode, args.workers, {**env, **extra, 'WEB_CONCURRENCY': str(args.workers)},
+                             token, conf)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Telemetry ingest throughput: pings/sec through POST /api/telemetry/.
+
+Runs the full Flask stack (JWT, rate limiter, parsing, bulk INSERT, commit)
+in-process against a throwaway SQLite database, so it measures the server
+side only. Run from backend/:
+
+    python benchmarks/telemetry_ingest.py [--pings 200000] [--batch 5000] [--vehicles 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import User, Vehicle  # noqa: E402
+from app.telemetry import BINARY, NDJSON, encode_binary  # noqa: E402
+
+
+def make_pings(count, vehicles, start):
+    return [{
+        'vehicle_number': f'BENCH-{i % vehicles}',
+        'ts': start + i // vehicles,
+        'lat': 19 + random.random(),
+        'lon': 72 + random.random(),
+        'speed': round(random.random() * 80, 2),
+    } for i in range(count)]
+
+
+def run(client, headers, batches, content_type):
+    started = time.perf_counter()
+    for body in batches:
+        response = client.post('/api/telemetry/', data=body,
+                               headers={**headers, 'Content-Type': content_type})
+        assert response.status_code == 201, response.get_json()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pings', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--vehicles', type=int, default=200)
+    args = parser.parse_args()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        RATELIMIT_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(phone='+10000000000', username='bench', email='bench@example.com', role='admin')
+        user.password_hash = 'x'
+        db.session.add(user)
+        db.session.add_all(Vehicle(vehicle_number=f'BENCH-{i}') for i in range(args.vehicles))
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=user.phone)}
+
+    client = app.test_client()
+    start = int(time.time()) - 86400
+    pings = make_pings(args.pings, args.vehicles, start)
+    chunks = [pings[i:i + args.batch] for i in range(0, len(pings), args.batch)]
+
+    ndjson = ['\n'.join(json.dumps(p) for p in chunk) for chunk in chunks]
+    binary = [encode_binary([{**p, 'ts': p['ts'] + 43200} for p in chunk]) for chunk in chunks]
+
+    for name, batches, content_type in (('ndjson', ndjson, NDJSON), ('binary', binary, BINARY)):
+        elapsed = run(client, headers, batches, content_type)
+        size = sum(len(b) for b in batches) / len(pings)
+        print(f'{name:7} {len(pings) / elapsed:10,.0f} pings/sec  '
+              f'({len(pings):,} pings, batches of {args.batch}, {size:.1f} bytes/ping)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Concurrent dispatch check for the atomic state transitions (app/transitions.py).
+
+Runs in-process against a throwaway SQLite database (or DATABASE_URL). For
+each round, --threads threads are released together by a barrier and race
+on the same row:
+
+- PUT /api/maintenance/<id>/complete on one open maintenance record
+- PUT /api/trips/<id>/complete on one active trip
+- transition(Vehicle, version == v, ...) from separate sessions, as two
+  dispatchers holding the same read would
+
+Exactly one racer must win each round and every other must get 409 (or
+change 0 rows); the vehicle's version must equal its number of successful
+writes. Exits non-zero on the first violation. Run from backend/:
+
+    python benchmarks/transition_race.py [--threads 16] [--rounds 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.depots import ensure_default_depot  # noqa: E402
+from app.models import Driver, Maintenance, Trip, User, Vehicle  # noqa: E402
+from app.transitions import transition  # noqa: E402
+
+
+def make_app():
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+            'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'race.db')
+        RATELIMIT_ENABLED = False
+        RESPONSE_CACHE_ENABLED = False
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        ensure_default_depot()
+        admin = User(phone='+10000', email='admin@fleet-bench.com', role='admin', password_hash='x')
+        db.session.add_all([admin, Vehicle(vehicle_number='RACE1', mileage=0),
+                            Driver(phone='+20000', name='Racer', license_number='RACE-LIC')])
+        db.session.commit()
+        token = create_access_token(identity='+10000', additional_claims={'role': 'admin', 'depot': 1})
+    return app, {'Authorization': f'Bearer {token}'}
+
+
+def race(threads, attempt):
+    """Run ``attempt`` in ``threads`` threads at once; returns their results."""
+    barrier = threading.Barrier(threads)
+    results = []
+    lock = threading.Lock()
+
+    def run():
+        barrier.wait()
+        result = attempt()
+        with lock:
+            results.append(result)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return Counter(results)
+
+
+def check(name, outcome, win, lose):
+    ok = outcome[win] == 1 and outcome[win] + outcome[lose] == sum(outcome.values())
+    print(f'{name}: {dict(outcome)}' + ('' if ok else '  <-- expected exactly one winner'))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    app, headers = make_app()
+    client = app.test_client()
+    vehicle_writes = 0
+    started = time.perf_counter()
+
+    for _ in range(args.rounds):
+        # Maintenance: put the vehicle in the shop, then everyone completes it at once
+        r = client.post('/api/maintenance/', headers=headers, json={
+            'vehicle_number': 'RACE1', 'type': 'service', 'date': date.today().isoformat(), 'duration_days': 1})
+        assert r.status_code == 201, r.get_json()
+        vehicle_writes += 1
+        maint_id = r.get_json()['maintenance']['id']
+        outcome = race(args.threads, lambda: app.test_client().put(
+            f'/api/maintenance/{maint_id}/complete', headers=headers).status_code)
+        if not check('complete maintenance', outcome, 200, 409):
+            sys.exit(1)
+        vehicle_writes += 1  # restored to active once
+
+        # Trips: everyone completes the same active trip
+        r = client.post('/api/trips/', headers=headers, json={
+            'vehicle_number': 'RACE1', 'driver_phone': '+20000', 'origin': 'A', 'destination': 'B',
+            'date': date.today().isoformat(), 'distance': 1})
+        assert r.status_code == 201, r.get_json()
+        trip_id = r.get_json()['trip']['id']
+        outcome = race(args.threads, lambda: app.test_client().put(
+            f'/api/trips/{trip_id}/complete', headers=headers).status_code)
+        if not check('complete trip', outcome, 200, 409):
+            sys.exit(1)
+        vehicle_writes += 1  # mileage accrued once
+
+        # Direct transitions: every racer read the same version
+        with app.app_context():
+            version = db.session.get(Vehicle, 'RACE1').version
+
+        def dispatch():
+            with app.app_context():
+                changed = transition(Vehicle, Vehicle.vehicle_number == 'RACE1', Vehicle.version == version,
+                                     status='active')
+                db.session.commit()
+                return changed
+
+        if not check('transition(Vehicle)', race(args.threads, dispatch), 1, 0):
+            sys.exit(1)
+        vehicle_writes += 1
+
+    with app.app_context():
+        vehicle = db.session.get(Vehicle, 'RACE1')
+        trips = Trip.query.filter_by(status='completed').count()
+        open_maintenance = Maintenance.query.filter(Maintenance.status != 'completed').count()
+    expected_version = 1 + vehicle_writes
+    print(f'vehicle version {vehicle.version} (expected {expected_version}), mileage {vehicle.mileage} '
+          f'(expected {args.rounds}), {trips} trips completed, {open_maintenance} maintenance open')
+    if (vehicle.version, vehicle.mileage, trips, open_maintenance) != (expected_version, args.rounds, args.rounds, 0):
+        sys.exit(1)
+    print(f'{args.rounds} rounds x {args.threads} threads OK in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Gunicorn settings used by the Procfile.
+
+The default is the original 4 sync workers. Set WORKER_CLASS=gevent to
+run cooperative workers instead, so slow clients and long-polling
+requests only park a greenlet rather than a whole process.
+
+Sync workers preload the app: the master imports it, warms caches and
+compiled statements once (app/prefork.py), and forks workers that start
+warm and share those pages. Cooperative workers must monkey-patch before
+the app is imported, so they load and warm it in each worker instead;
+PRELOAD_APP (or gunicorn's --preload) overrides the default.
+"""
+import gc
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = os.environ.get('WORKER_CLASS', 'sync')
+
+# Concurrent greenlets per worker (ignored by sync workers)
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.environ.get('WORKER_TIMEOUT', 30))
+
+preload_app = os.environ.get(
+    'PRELOAD_APP', 'true' if worker_class == 'sync' else 'false').lower() == 'true'
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app.prefork import warm_up
+    elapsed = warm_up(server.app.wsgi())
+    server.log.info('App warmed up in %.0fms before forking workers', elapsed * 1000)
+    # Keep the collector from writing to (and so un-sharing) the warmed
+    # objects' pages in every worker
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app.prefork import after_fork
+        after_fork(server.app.wsgi())
+    _patch_psycopg(server, worker)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from app.prefork import warm_up
+        elapsed = warm_up(worker.wsgi)
+        worker.log.info('Worker %s warmed up in %.0fms', worker.pid, elapsed * 1000)
+
+
+def _patch_psycopg(server, worker):
+    # psycopg2 talks to the socket in C, bypassing gevent's monkey patching;
+    # a wait callback makes it yield to the hub while waiting on Postgres
+    # instead of blocking every greenlet in the worker.
+    if worker_class != 'gevent':
+        return
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        return
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    server.log.info('Worker %s: psycopg2 patched for %s', worker.pid, worker_class)
@@ -1,12 +1,17 @@
 import os
 from app import create_app, db
 from app.models import User, Vehicle, Driver
+from app.depots import ensure_default_depot
+from app.search import get_search_backend
 
 app = create_app()
 
 # Move database creation outside the if block so Gunicorn runs it on Heroku
 with app.app_context():
     db.create_all()
+    ensure_default_depot()
+    # Set up search index tables/triggers before serving writes
+    get_search_backend()
 
 @app.shell_context_processor
 def make_shell_context():
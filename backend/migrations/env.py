@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -45,6 +46,18 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Search index objects are created by app/search.py at startup, not by
+# migrations: FTS5 tables (and their shadow tables) and pg_trgm indexes
+SEARCH_INDEX_OBJECT = re.compile(r'_fts(_(data|idx|content|docsize|config))?$|_trgm$')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None and type_ in ('table', 'index') \
+            and SEARCH_INDEX_OBJECT.search(name):
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +78,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +107,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
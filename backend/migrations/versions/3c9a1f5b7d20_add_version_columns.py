@@ -0,0 +1,28 @@
+"""add optimistic version columns to vehicles, trips and maintenance
+
+Revision ID: 3c9a1f5b7d20
+Revises: e699f822e838
+Create Date: 2026-10-19 09:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1f5b7d20'
+down_revision = 'e699f822e838'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('vehicles', 'trips', 'maintenance'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in ('maintenance', 'trips', 'vehicles'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,49 @@
+"""add driver odometer, maintenance mileage and trip/maintenance indexes
+
+Revision ID: 8b41d2e6c9a3
+Revises: 3c9a1f5b7d20
+Create Date: 2026-10-19 10:47:05.318642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d2e6c9a3'
+down_revision = '3c9a1f5b7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('odometer', sa.Integer(), nullable=True, server_default='0'))
+
+    # Existing drivers start from the distance of their completed trips
+    op.execute(
+        'UPDATE drivers SET odometer = COALESCE(('
+        'SELECT SUM(CAST(ROUND(COALESCE(trips.distance, 0)) AS INTEGER)) FROM trips '
+        "WHERE trips.status = 'completed' AND trips.driver_phone = drivers.phone), 0)"
+    )
+
+    with op.batch_alter_table('maintenance', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mileage', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_maintenance_vehicle_type', ['vehicle_number', 'type'], unique=False)
+
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_trips_vehicle_number'), ['vehicle_number'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trips_driver_phone'), ['driver_phone'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trips_driver_phone'))
+        batch_op.drop_index(batch_op.f('ix_trips_vehicle_number'))
+
+    with op.batch_alter_table('maintenance', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_vehicle_type')
+        batch_op.drop_column('mileage')
+
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.drop_column('odometer')
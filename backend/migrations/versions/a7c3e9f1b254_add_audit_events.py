@@ -0,0 +1,40 @@
+"""add audit_events table
+
+Revision ID: a7c3e9f1b254
+Revises: f2b8c61d4e07
+Create Date: 2026-10-19 15:51:37.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f1b254'
+down_revision = 'f2b8c61d4e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_events',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('actor', sa.String(length=20), nullable=True),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('entity', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.String(length=50), nullable=True),
+    sa.Column('changes', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('audit_events', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_events_actor', ['actor', 'id'], unique=False)
+        batch_op.create_index('ix_audit_events_entity', ['entity', 'entity_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audit_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_events_entity')
+        batch_op.drop_index('ix_audit_events_actor')
+
+    op.drop_table('audit_events')
@@ -0,0 +1,107 @@
+"""add depots and partition fleet tables, audit events and lane rollups by depot_id
+
+Revision ID: a9d3c5e7f102
+Revises: f6c2a9d4b813
+Create Date: 2026-10-19 19:04:27.512936
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3c5e7f102'
+down_revision = 'f6c2a9d4b813'
+branch_labels = None
+depends_on = None
+
+DEFAULT_DEPOT_ID = 1
+
+# table -> composite index on (depot_id, ...)
+INDEXES = {
+    'vehicles': ('ix_vehicles_depot_status', ['depot_id', 'status']),
+    'drivers': ('ix_drivers_depot_status', ['depot_id', 'status']),
+    'trips': ('ix_trips_depot_status', ['depot_id', 'status']),
+    'trips_archive': ('ix_trips_archive_depot_completed_at', ['depot_id', 'completed_at']),
+    'maintenance': ('ix_maintenance_depot_vehicle', ['depot_id', 'vehicle_number']),
+    'users': ('ix_users_depot_role', ['depot_id', 'role']),
+}
+
+
+def upgrade():
+    op.create_table('depots',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    # No explicit id: the new table hands out DEFAULT_DEPOT_ID first, and on
+    # Postgres the id sequence has to move past it for the next depot
+    op.execute(sa.text("INSERT INTO depots (name, created_at) VALUES ('Main', CURRENT_TIMESTAMP)"))
+
+    # Add the column nullable first so existing rows can be backfilled
+    for table in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('depot_id', sa.Integer(), nullable=True))
+
+    # Vehicles, drivers and users start in the default depot; trips and
+    # maintenance follow their vehicle (falling back to the default depot)
+    for table in ('vehicles', 'drivers', 'users'):
+        op.execute(sa.text(f'UPDATE {table} SET depot_id = :id').bindparams(id=DEFAULT_DEPOT_ID))
+    for table in ('trips', 'trips_archive', 'maintenance'):
+        op.execute(sa.text(
+            f'UPDATE {table} SET depot_id = COALESCE('
+            f'(SELECT vehicles.depot_id FROM vehicles WHERE vehicles.vehicle_number = {table}.vehicle_number), '
+            f':id)'
+        ).bindparams(id=DEFAULT_DEPOT_ID))
+
+    for table, (index, columns) in INDEXES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('depot_id', existing_type=sa.Integer(), nullable=False,
+                                  server_default=str(DEFAULT_DEPOT_ID))
+            if table != 'trips_archive':
+                batch_op.create_foreign_key(f'fk_{table}_depot_id_depots', 'depots', ['depot_id'], ['id'])
+            batch_op.create_index(index, columns, unique=False)
+
+    # Audit events record the depot of the changed record (nullable: fleet-wide
+    # events have none); everything logged so far happened in the default depot
+    with op.batch_alter_table('audit_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('depot_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_audit_events_depot', ['depot_id', 'id'], unique=False)
+    op.execute(sa.text('UPDATE audit_events SET depot_id = :id').bindparams(id=DEFAULT_DEPOT_ID))
+
+    # Lane rollups are kept per depot, so the depot joins their key; every
+    # trip rolled up so far belongs to the default depot
+    with op.batch_alter_table('lane_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('depot_id', sa.Integer(), nullable=False,
+                                      server_default=str(DEFAULT_DEPOT_ID)))
+        if op.get_bind().dialect.name != 'sqlite':  # SQLite rebuilds the table with the new key
+            batch_op.drop_constraint('lane_stats_pkey', type_='primary')
+        batch_op.create_primary_key('lane_stats_pkey', ['depot_id', 'origin_id', 'destination_id', 'period'])
+        batch_op.create_foreign_key('fk_lane_stats_depot_id_depots', 'depots', ['depot_id'], ['id'])
+
+
+def downgrade():
+    # Rollups of several depots may share a lane key once the depot is gone;
+    # rebuild them afterwards with `flask fleet backfill-lanes`
+    op.execute(sa.text('DELETE FROM lane_stats'))
+    with op.batch_alter_table('lane_stats', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_lane_stats_depot_id_depots', type_='foreignkey')
+        if op.get_bind().dialect.name != 'sqlite':
+            batch_op.drop_constraint('lane_stats_pkey', type_='primary')
+        batch_op.drop_column('depot_id')
+        batch_op.create_primary_key('lane_stats_pkey', ['origin_id', 'destination_id', 'period'])
+
+    with op.batch_alter_table('audit_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_events_depot')
+        batch_op.drop_column('depot_id')
+
+    for table, (index, columns) in INDEXES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(index)
+            if table != 'trips_archive':
+                batch_op.drop_constraint(f'fk_{table}_depot_id_depots', type_='foreignkey')
+            batch_op.drop_column('depot_id')
+
+    op.drop_table('depots')
@@ -0,0 +1,40 @@
+"""never reuse trip ids on SQLite (AUTOINCREMENT)
+
+Revision ID: c2f7e9a4d186
+Revises: a9d3c5e7f102
+Create Date: 2026-10-19 20:41:09.305718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f7e9a4d186'
+down_revision = 'a9d3c5e7f102'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Without AUTOINCREMENT SQLite hands out max(rowid) + 1, so ids of trips
+    # that were archived off the top of the table come back for new trips.
+    # Other databases use sequences, which never go backwards.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('trips', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # Start the sequence above every id already used, archived ones included
+    op.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'trips'"))
+    op.execute(sa.text(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'trips', COALESCE(MAX(id), 0) FROM ("
+        "SELECT MAX(id) AS id FROM trips UNION ALL SELECT MAX(id) FROM trips_archive)"
+    ))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('trips', schema=None, recreate='always'):
+        pass
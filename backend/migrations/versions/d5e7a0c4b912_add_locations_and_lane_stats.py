@@ -0,0 +1,65 @@
+"""add locations dictionary, trip location ids and lane_stats rollup
+
+Revision ID: d5e7a0c4b912
+Revises: 8b41d2e6c9a3
+Create Date: 2026-10-19 13:26:48.551730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e7a0c4b912'
+down_revision = '8b41d2e6c9a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('locations',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_table('lane_stats',
+    sa.Column('origin_id', sa.Integer(), nullable=False),
+    sa.Column('destination_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('trip_count', sa.Integer(), nullable=False),
+    sa.Column('total_distance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['destination_id'], ['locations.id'], ),
+    sa.ForeignKeyConstraint(['origin_id'], ['locations.id'], ),
+    sa.PrimaryKeyConstraint('origin_id', 'destination_id', 'period')
+    )
+    with op.batch_alter_table('lane_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_lane_stats_period_count', ['period', 'trip_count'], unique=False)
+
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('origin_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('destination_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_trips_origin_id'), ['origin_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trips_destination_id'), ['destination_id'], unique=False)
+        batch_op.create_foreign_key('fk_trips_origin_id_locations', 'locations', ['origin_id'], ['id'])
+        batch_op.create_foreign_key('fk_trips_destination_id_locations', 'locations', ['destination_id'], ['id'])
+
+    # Populate with: flask fleet backfill-lanes
+
+
+def downgrade():
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_trips_destination_id_locations', type_='foreignkey')
+        batch_op.drop_constraint('fk_trips_origin_id_locations', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_trips_destination_id'))
+        batch_op.drop_index(batch_op.f('ix_trips_origin_id'))
+        batch_op.drop_column('destination_id')
+        batch_op.drop_column('origin_id')
+
+    with op.batch_alter_table('lane_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_lane_stats_period_count')
+
+    op.drop_table('lane_stats')
+    op.drop_table('locations')
@@ -0,0 +1,37 @@
+"""add telemetry_pings table
+
+Revision ID: d8a2f6c3e471
+Revises: c4e1a7b9d350
+Create Date: 2026-10-19 17:02:44.310592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a2f6c3e471'
+down_revision = 'c4e1a7b9d350'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('telemetry_pings',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('vehicle_number', sa.String(length=50), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lon', sa.Float(), nullable=False),
+    sa.Column('speed', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('telemetry_pings', schema=None) as batch_op:
+        batch_op.create_index('ix_telemetry_pings_vehicle_ts', ['vehicle_number', 'ts'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('telemetry_pings', schema=None) as batch_op:
+        batch_op.drop_index('ix_telemetry_pings_vehicle_ts')
+
+    op.drop_table('telemetry_pings')
@@ -0,0 +1,58 @@
+"""add trips_archive table and trips status/completed_at index
+
+Revision ID: f2b8c61d4e07
+Revises: d5e7a0c4b912
+Create Date: 2026-10-19 15:02:11.930274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8c61d4e07'
+down_revision = 'd5e7a0c4b912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trips_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('vehicle_number', sa.String(length=50), nullable=False),
+    sa.Column('driver_phone', sa.String(length=20), nullable=False),
+    sa.Column('origin', sa.String(length=255), nullable=False),
+    sa.Column('destination', sa.String(length=255), nullable=False),
+    sa.Column('origin_id', sa.Integer(), nullable=True),
+    sa.Column('destination_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('distance', sa.Float(), nullable=True),
+    sa.Column('fuel_type', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['destination_id'], ['locations.id'], ),
+    sa.ForeignKeyConstraint(['origin_id'], ['locations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trips_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_trips_archive_completed_at'), ['completed_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trips_archive_driver_phone'), ['driver_phone'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trips_archive_vehicle_number'), ['vehicle_number'], unique=False)
+
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.create_index('ix_trips_status_completed_at', ['status', 'completed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.drop_index('ix_trips_status_completed_at')
+
+    with op.batch_alter_table('trips_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trips_archive_vehicle_number'))
+        batch_op.drop_index(batch_op.f('ix_trips_archive_driver_phone'))
+        batch_op.drop_index(batch_op.f('ix_trips_archive_completed_at'))
+
+    op.drop_table('trips_archive')
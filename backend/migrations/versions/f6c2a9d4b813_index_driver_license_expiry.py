@@ -0,0 +1,25 @@
+"""index drivers.license_expiry for compliance sweeps
+
+Revision ID: f6c2a9d4b813
+Revises: e3b9d1f7a248
+Create Date: 2026-10-19 18:12:40.118302
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c2a9d4b813'
+down_revision = 'e3b9d1f7a248'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_drivers_license_expiry'), ['license_expiry'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('drivers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_drivers_license_expiry'))
@@ -7,10 +7,116 @@
 const API_URL = window.location.hostname === 'localhost' 
   ? 'http://localhost:5000/api' 
   : '/api'; 
+/**
+ * Response cache for GET requests
+ * Entries are keyed by endpoint and hold the parsed body, its ETag and
+ * an expiry time. TTLs are per top-level resource (milliseconds).
+ */
+const CACHE_TTL = {
+  '/vehicles': 30000,
+  '/drivers': 30000,
+  '/users': 30000,
+  '/trips': 15000,
+  '/maintenance': 15000,
+};
+
+// Writes to a resource also invalidate the resources they touch server-side
+const CACHE_DEPENDENTS = {
+  '/maintenance': ['/vehicles'],
+  '/trips': ['/vehicles', '/drivers'],
+  '/users': ['/drivers'],
+};
+
+const responseCache = new Map();
+const inFlightRequests = new Map();
+
+/**
+ * Top-level resource of an endpoint, e.g. '/trips/?status=active' -> '/trips'
+ */
+function resourceOf(endpoint) {
+  return `/${endpoint.split('/')[1].split('?')[0]}`;
+}
+
+/**
+ * Drop cached responses for the given resources (and their dependents)
+ */
+function invalidateCache(...resources) {
+  const targets = new Set();
+  resources.forEach((resource) => {
+    targets.add(resource);
+    (CACHE_DEPENDENTS[resource] || []).forEach((dep) => targets.add(dep));
+  });
+
+  for (const key of responseCache.keys()) {
+    if (targets.has(resourceOf(key))) {
+      responseCache.delete(key);
+    }
+  }
+  console.log(`[cache] Invalidated:`, [...targets]);
+}
+
+/**
+ * Drop every cached response (e.g. on logout, when the role changes)
+ */
+function clearCache() {
+  responseCache.clear();
+  inFlightRequests.clear();
+}
+
 /**
  * Make an authenticated API request
+ *
+ * GET requests are served from the response cache while fresh, coalesced
+ * with an identical request already in flight, and revalidated with
+ * If-None-Match once stale. Pass `cache: false` to bypass the cache.
+ * Successful writes invalidate the resource they target; pass
+ * `invalidate: [...]` to override which resources are dropped.
  */
 async function apiRequest(endpoint, options = {}) {
+  const { cache = true, invalidate, ...fetchOptions } = options;
+  const method = (fetchOptions.method || 'GET').toUpperCase();
+
+  if (method !== 'GET' || !cache) {
+    const data = await sendRequest(endpoint, fetchOptions);
+    if (method !== 'GET') {
+      invalidateCache(...(invalidate || [resourceOf(endpoint)]));
+    }
+    return data;
+  }
+
+  const cached = responseCache.get(endpoint);
+  if (cached && cached.expires > Date.now()) {
+    console.log(`[apiRequest] Cache hit: ${endpoint}`);
+    return cached.data;
+  }
+
+  if (inFlightRequests.has(endpoint)) {
+    console.log(`[apiRequest] Joining in-flight request: ${endpoint}`);
+    return inFlightRequests.get(endpoint);
+  }
+
+  const request = sendRequest(endpoint, fetchOptions, cached, true)
+    .then(({ data, etag }) => {
+      const ttl = CACHE_TTL[resourceOf(endpoint)] || 0;
+      responseCache.set(endpoint, { data, etag, expires: Date.now() + ttl });
+      return data;
+    })
+    .finally(() => {
+      inFlightRequests.delete(endpoint);
+    });
+
+  inFlightRequests.set(endpoint, request);
+  return request;
+}
+
+/**
+ * Perform the HTTP request
+ *
+ * When `cached` is given the request is conditional and a 304 answer
+ * reuses the cached body. With `withMeta` the result is returned as
+ * `{ data, etag }` (the cache path); otherwise it is the parsed body.
+ */
+async function sendRequest(endpoint, options = {}, cached = undefined, withMeta = false) {
   console.log(`[apiRequest] Making request to: ${endpoint}`, options);
   const token = localStorage.getItem('access_token');
   const headers = {
@@ -25,6 +131,10 @@ async function apiRequest(endpoint, options = {}) {
     console.warn(`[apiRequest] WARNING: No auth token found`);
   }
 
+  if (cached && cached.etag) {
+    headers['If-None-Match'] = cached.etag;
+  }
+
   try {
     const response = await fetch(`${API_URL}${endpoint}`, {
       ...options,
@@ -33,6 +143,11 @@ async function apiRequest(endpoint, options = {}) {
 
     console.log(`[apiRequest] Response status: ${response.status}`);
 
+    if (response.status === 304 && cached) {
+      console.log(`[apiRequest] Not modified, reusing cached data`);
+      return { data: cached.data, etag: cached.etag };
+    }
+
     if (!response.ok) {
       const error = await response.json().catch(() => ({}));
       console.error(`[apiRequest] HTTP Error: ${response.status}`, error);
@@ -45,13 +160,23 @@ async function apiRequest(endpoint, options = {}) {
 
     const data = await response.json();
     console.log(`[apiRequest] Response data:`, data);
-    return data;
+    return withMeta ? { data, etag: response.headers.get('ETag') } : data;
   } catch (error) {
     console.error(`[apiRequest] Request failed:`, error);
     throw error;
   }
 }
 
+/**
+ * Run several API calls in parallel and collect their results by name
+ * e.g. batchLoad({ vehicles: () => vehicleService.getAll() })
+ */
+async function batchLoad(loaders) {
+  const names = Object.keys(loaders);
+  const results = await Promise.all(names.map((name) => loaders[name]()));
+  return names.reduce((acc, name, i) => ({ ...acc, [name]: results[i] }), {});
+}
+
 /**
  * Authentication Service
  */
@@ -64,10 +189,13 @@ const authService = {
   },
 
   async login(credentials) {
-    return apiRequest('/auth/login', {
+    const response = await apiRequest('/auth/login', {
       method: 'POST',
       body: JSON.stringify(credentials),
     });
+    // A different account may see different data
+    clearCache();
+    return response;
   },
 
   async getCurrentUser() {
@@ -77,8 +205,15 @@ const authService = {
   },
 
   logout() {
+    // Revoke the tokens server-side; the request reads the token before it is removed
+    const refreshToken = localStorage.getItem('refresh_token');
+    sendRequest('/auth/logout', {
+      method: 'POST',
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    }).catch(() => {});
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
+    clearCache();
   },
 };
 
@@ -210,6 +345,13 @@ const tripService = {
     });
   },
 
+  async completeMany(ids) {
+    return apiRequest('/trips/complete', {
+      method: 'POST',
+      body: JSON.stringify({ ids }),
+    });
+  },
+
   async delete(id) {
     return apiRequest(`/trips/${id}`, {
       method: 'DELETE',
@@ -246,9 +388,50 @@ const maintenanceService = {
     });
   },
 
+  async completeMany(ids) {
+    return apiRequest('/maintenance/complete', {
+      method: 'POST',
+      body: JSON.stringify({ ids }),
+    });
+  },
+
   async checkExpired() {
-    return apiRequest('/maintenance/check-expired', {
+    const result = await apiRequest('/maintenance/check-expired', {
       method: 'POST',
+      invalidate: [],
+    });
+    if (result.restored_count > 0) {
+      invalidateCache('/maintenance');
+    }
+    return result;
+  },
+};
+
+/**
+ * Dashboard Service
+ */
+const dashboardService = {
+  async loadAll() {
+    // Restore expired maintenance first so the lists below reflect it
+    await maintenanceService.checkExpired();
+    return batchLoad({
+      vehicles: () => vehicleService.getAll(),
+      drivers: () => driverService.getAll(),
+      trips: () => tripService.getAll('active'),
+      maintenance: () => maintenanceService.getAll(),
+    });
+  },
+};
+
+/**
+ * Search Service
+ */
+const searchService = {
+  async search(query, { type = null, page = 1, perPage = 20 } = {}) {
+    const params = new URLSearchParams({ q: query, page, per_page: perPage });
+    if (type) params.set('type', type);
+    return apiRequest(`/search?${params}`, {
+      method: 'GET',
     });
   },
 };
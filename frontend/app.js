@@ -261,38 +261,25 @@ function showSuccess(message) {
 async function loadDashboardData() {
   console.log(`[loadDashboardData] Starting to load dashboard data`);
   try {
-    // Load vehicles
-    console.log(`[loadDashboardData] Fetching vehicles...`);
-    const vehiclesResponse = await vehicleService.getAll();
-    console.log(`[loadDashboardData] Vehicles response:`, vehiclesResponse);
+    // Load vehicles, drivers, active trips and maintenance records in parallel
+    // (expired maintenance is restored first)
+    console.log(`[loadDashboardData] Fetching dashboard resources...`);
+    const {
+      vehicles: vehiclesResponse,
+      drivers: driversResponse,
+      trips: tripsResponse,
+      maintenance: maintenanceResponse,
+    } = await dashboardService.loadAll();
+
     appState.vehicles = vehiclesResponse.vehicles || vehiclesResponse.data || [];
     console.log(`[loadDashboardData] appState.vehicles set to:`, appState.vehicles);
-    
-    // Load drivers
-    console.log(`[loadDashboardData] Fetching drivers...`);
-    const driversResponse = await driverService.getAll();
-    console.log(`[loadDashboardData] Drivers response:`, driversResponse);
     appState.drivers = driversResponse.drivers || driversResponse.data || [];
     console.log(`[loadDashboardData] appState.drivers set to:`, appState.drivers);
-    
-    // Load active trips
-    console.log(`[loadDashboardData] Fetching active trips...`);
-    const tripsResponse = await tripService.getAll('active');
-    console.log(`[loadDashboardData] Trips response:`, tripsResponse);
     appState.tripRecords = tripsResponse.trips || [];
     console.log(`[loadDashboardData] appState.tripRecords set to:`, appState.tripRecords);
-    
-    // Load maintenance records
-    console.log(`[loadDashboardData] Fetching maintenance records...`);
-    const maintenanceResponse = await maintenanceService.getAll();
-    console.log(`[loadDashboardData] Maintenance response:`, maintenanceResponse);
     appState.maintenanceRecords = maintenanceResponse.maintenance || [];
     console.log(`[loadDashboardData] appState.maintenanceRecords set to:`, appState.maintenanceRecords);
     
-    // Check for expired maintenance
-    console.log(`[loadDashboardData] Checking for expired maintenance...`);
-    await maintenanceService.checkExpired();
-    
     // Update dashboard stats
     updateDashboardStats();
     